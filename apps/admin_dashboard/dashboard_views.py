@@ -637,7 +637,8 @@ def active_dispatch_realtime(request):
         active_jobs = JobOffer.objects.filter(
             status__in=['ACCEPTED', 'EN_ROUTE', 'ARRIVED', 'IN_PROGRESS']
         ).select_related(
-            'tech', 'tech__user', 'assistance_request', 'assistance_request__user'
+            'tech', 'tech__user', 'assistance_request', 'assistance_request__user',
+            'assistance_request__service_category'
         ).order_by('-offered_at')
 
         dispatches = []
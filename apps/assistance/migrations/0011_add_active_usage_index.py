@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-17 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistance', '0010_add_phone_and_json_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assistancerequest',
+            index=models.Index(condition=models.Q(('status__in', ['COMPLETED', 'IN_PROGRESS', 'ASSIGNED'])), fields=['user', 'service_category', 'created_at'], name='assistance_active_idx'),
+        ),
+    ]
@@ -148,6 +148,12 @@ class AssistanceRequest(models.Model):
             models.Index(fields=['status', 'created_at']),
             models.Index(fields=['user', 'status']),
             models.Index(fields=['provider', 'status']),
+            # Yearly MAWDY usage counts only look at these statuses
+            models.Index(
+                fields=['user', 'service_category', 'created_at'],
+                condition=models.Q(status__in=['COMPLETED', 'IN_PROGRESS', 'ASSIGNED']),
+                name='assistance_active_idx',
+            ),
         ]
 
     def __str__(self):
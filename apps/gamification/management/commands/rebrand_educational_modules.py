@@ -4,9 +4,26 @@ Runs on every deployment to ensure clean branding
 """
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.db.models import Q
 from apps.gamification.models import EducationalModule, QuizQuestion
 import re
 
+# Old brand names (whole words) and whitespace runs, compiled once
+_BRAND_RE = re.compile(r'\b(MAPFRE|MAWDY)\b', re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+
+MODULE_TEXT_FIELDS = ('titulo', 'descripcion', 'contenido')
+QUESTION_TEXT_FIELDS = ('pregunta', 'opcion_a', 'opcion_b', 'opcion_c', 'opcion_d', 'explicacion')
+
+
+def _mentions_old_branding(fields):
+    """Q matching rows where any of the fields mentions MAPFRE or MAWDY"""
+    condition = Q()
+    for field in fields:
+        for brand in ('mapfre', 'mawdy'):
+            condition |= Q(**{f'{field}__icontains': brand})
+    return condition
+
 
 class Command(BaseCommand):
     help = 'Remove MAPFRE/MAWDY branding from educational modules'
@@ -20,8 +37,8 @@ class Command(BaseCommand):
             updated_modules = 0
             updated_questions = 0
 
-            # Process all educational modules
-            for module in EducationalModule.objects.all():
+            # Process educational modules mentioning an old brand
+            for module in EducationalModule.objects.filter(_mentions_old_branding(MODULE_TEXT_FIELDS)):
                 changed = False
 
                 # Clean titulo
@@ -46,8 +63,8 @@ class Command(BaseCommand):
                     module.save()
                     updated_modules += 1
 
-            # Process all quiz questions
-            for question in QuizQuestion.objects.all():
+            # Process quiz questions mentioning an old brand
+            for question in QuizQuestion.objects.filter(_mentions_old_branding(QUESTION_TEXT_FIELDS)):
                 changed = False
 
                 # Clean pregunta
@@ -92,10 +109,8 @@ class Command(BaseCommand):
         if not text:
             return text
 
-        # Replace MAPFRE with SegurifAI
-        text = re.sub(r'\bMAPFRE\b', 'SegurifAI', text, flags=re.IGNORECASE)
-        # Remove MAWDY (usually appears as standalone brand)
-        text = re.sub(r'\bMAWDY\b', 'SegurifAI', text, flags=re.IGNORECASE)
+        # Replace MAPFRE and MAWDY (usually a standalone brand) with SegurifAI
+        text = _BRAND_RE.sub('SegurifAI', text)
         # Clean up any double spaces
-        text = re.sub(r'\s+', ' ', text)
+        text = _WS_RE.sub(' ', text)
         return text.strip()
@@ -132,6 +132,10 @@ class FieldTechProfile(models.Model):
         app_label = 'providers'
         verbose_name = 'Field Tech Profile'
         verbose_name_plural = 'Field Tech Profiles'
+        indexes = [
+            # Serves the bounding-box range pre-filter in find_nearby_techs
+            models.Index(fields=['current_latitude', 'current_longitude']),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.vehicle_type}"
@@ -494,6 +498,32 @@ class DispatchService:
 
         return R * c
 
+    @staticmethod
+    def bounding_box(latitude: float, longitude: float, radius_km: float) -> Dict[str, float]:
+        """
+        Latitude/longitude bounds of a square enclosing the search circle.
+        Used as an indexed pre-filter before the exact Haversine check.
+        """
+        # Same sphere as calculate_distance (R = 6371 km), so the box always contains the circle
+        angular_radius = radius_km / 6371
+        lat_delta = math.degrees(angular_radius)
+        cos_lat = math.cos(math.radians(float(latitude)))
+        if math.sin(angular_radius) < cos_lat:
+            # Widest longitude reached by the circle, which lies poleward of its centre
+            lon_delta = math.degrees(math.asin(math.sin(angular_radius) / cos_lat))
+        else:
+            lon_delta = 180.0
+        # Small margin so float rounding can't drop a point right on the circle
+        lat_delta *= 1.0001
+        lon_delta *= 1.0001
+
+        return {
+            'min_lat': float(latitude) - lat_delta,
+            'max_lat': float(latitude) + lat_delta,
+            'min_lon': float(longitude) - lon_delta,
+            'max_lon': float(longitude) + lon_delta,
+        }
+
     @staticmethod
     def estimate_arrival_time(distance_km: float, vehicle_type: str = 'MOTORCYCLE') -> int:
         """
@@ -532,13 +562,15 @@ class DispatchService:
         from .dispatch import FieldTechProfile
 
         cutoff = timezone.now() - timedelta(minutes=5)
+        box = cls.bounding_box(latitude, longitude, radius_km)
 
+        # Only techs inside the bounding box reach the Haversine check below
         available_techs = FieldTechProfile.objects.filter(
             status=FieldTechProfile.Status.ACTIVE,
             is_online=True,
             last_location_update__gte=cutoff,
-            current_latitude__isnull=False,
-            current_longitude__isnull=False
+            current_latitude__range=(box['min_lat'], box['max_lat']),
+            current_longitude__range=(box['min_lon'], box['max_lon'])
         )
 
         # Filter by service capability
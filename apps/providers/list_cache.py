@@ -0,0 +1,54 @@
+"""
+Provider List Cache
+
+Cache-aside storage for serialized provider list pages. Every key embeds a
+version token; bumping the token on any provider, category or review write
+invalidates all cached pages at once without needing key pattern deletes
+(which Django's cache API doesn't offer).
+
+Only enabled with a shared cache (settings.PROVIDER_LIST_CACHE_ENABLED):
+with per-process local memory a bump would not reach the other workers.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Seconds a cached list page is served
+PROVIDER_LIST_CACHE_TIMEOUT = 60
+
+PROVIDER_LIST_VERSION_KEY = 'providers:list:version'
+
+
+def _list_scope(user):
+    """Which provider rows the user can see (mirrors ProviderViewSet.get_queryset)"""
+    if user.is_authenticated and user.is_admin:
+        return 'admin'
+    if user.is_authenticated and user.is_provider:
+        return f'provider:{user.pk}'
+    return 'public'
+
+
+def provider_list_cache_key(request, scope=None):
+    """Cache key for a list request: visibility scope, query params and version"""
+    version = cache.get(PROVIDER_LIST_VERSION_KEY, 0)
+    params = hashlib.md5(request.query_params.urlencode().encode(), usedforsecurity=False).hexdigest()
+    return f'providers:list:{version}:{scope or _list_scope(request.user)}:{params}'
+
+
+def invalidate_provider_list_cache():
+    """Make every cached list page stale"""
+    cache.set(PROVIDER_LIST_VERSION_KEY, time.time_ns(), None)
+
+
+def cached_provider_list(request, build, scope=None):
+    """Serve build()'s data from the cache when enabled, storing it on a miss"""
+    if not settings.PROVIDER_LIST_CACHE_ENABLED:
+        return build()
+    cache_key = provider_list_cache_key(request, scope=scope)
+    data = cache.get(cache_key)
+    if data is None:
+        data = build()
+        cache.set(cache_key, data, PROVIDER_LIST_CACHE_TIMEOUT)
+    return data
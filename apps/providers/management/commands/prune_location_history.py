@@ -0,0 +1,48 @@
+"""
+Management command to prune old provider location history
+
+ProviderLocationHistory gets one row per GPS ping and grows without bound.
+Run this periodically (e.g. a daily cron) to keep only recent history.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.providers.models import ProviderLocationHistory
+
+
+class Command(BaseCommand):
+    help = 'Delete provider location history older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Keep history recorded within this many days (default: 90)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows deleted per statement (default: 5000)',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+
+        expired = ProviderLocationHistory.objects.filter(recorded_at__lt=cutoff).order_by('pk')
+
+        # Delete in short batches so each statement holds its locks briefly
+        total = 0
+        while True:
+            pks = list(expired.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            deleted, _ = ProviderLocationHistory.objects.filter(pk__in=pks).delete()
+            total += deleted
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {total} location history rows recorded before {cutoff:%Y-%m-%d}'
+        ))
@@ -4,7 +4,8 @@ For Guatemala market with GTQ currency
 """
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.db import connection, transaction
 from apps.providers.models import Provider, ProviderReview
 from apps.assistance.models import AssistanceRequest, RequestUpdate, RequestDocument
 from apps.services.models import ServiceCategory, ServicePlan, UserService
@@ -12,6 +13,23 @@ from apps.paq_wallet.models import WalletTransaction
 
 User = get_user_model()
 
+SEGURIFAI_VERIFICATION_NOTES = (
+    'SegurifAI es una aseguradora global con más de 85 años de experiencia. '
+    'En Guatemala, ofrecemos servicios de asistencia vial, médica y protección '
+    'de tarjetas con cobertura nacional 24/7.'
+)
+
+# 24/7 schedule shared by every day of the week
+_24_7 = {'start': '00:00', 'end': '23:59'}
+FULL_WEEK_HOURS = {
+    day: _24_7
+    for day in ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+}
+
+# Iterations used for the admin password with --fast. Django re-hashes it with
+# the configured hasher on the first successful login.
+FAST_PASSWORD_ITERATIONS = 1000
+
 
 class Command(BaseCommand):
     help = 'Clear all test data and setup SegurifAI as the only provider for Guatemala'
@@ -22,91 +40,132 @@ class Command(BaseCommand):
             action='store_true',
             help='Confirm deletion of all test data',
         )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='Skip the cleanup and upsert the SegurifAI setup data in place',
+        )
+        parser.add_argument(
+            '--fast',
+            action='store_true',
+            help='Hash the admin password with a low iteration count (development only)',
+        )
 
     def handle(self, *args, **options):
-        if not options['confirm']:
+        keep_data = options['keep_data']
+
+        if not options['confirm'] and not keep_data:
             self.stdout.write(
                 self.style.WARNING(
                     'This command will DELETE ALL existing data including users, providers, '
                     'requests, and transactions.\n'
-                    'Run with --confirm to proceed.'
+                    'Run with --confirm to proceed, or --keep-data to only upsert the setup data.'
                 )
             )
             return
 
-        self.stdout.write(self.style.WARNING('Starting data cleanup...'))
-
+        # Clear (unless --keep-data) and create (or update) the production data
+        # atomically. Every write is keyed on a natural key so re-runs are idempotent.
         with transaction.atomic():
-            # Delete all data
-            self.stdout.write('Deleting request documents...')
-            RequestDocument.objects.all().delete()
+            if connection.vendor == 'postgresql':
+                # Skip the WAL flush wait on COMMIT: a crash right after it can lose the
+                # whole run, but never leaves it half applied
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL synchronous_commit = OFF')
+
+            if not keep_data:
+                self.stdout.write(self.style.WARNING('Starting data cleanup...'))
 
-            self.stdout.write('Deleting request updates...')
-            RequestUpdate.objects.all().delete()
+                # Clear existing data in the same transaction as the setup below,
+                # so a failed run rolls back to the data it started with
+                self.stdout.write('Deleting request documents...')
+                RequestDocument.objects.all().delete()
 
-            self.stdout.write('Deleting assistance requests...')
-            AssistanceRequest.objects.all().delete()
+                self.stdout.write('Deleting request updates...')
+                RequestUpdate.objects.all().delete()
 
-            self.stdout.write('Deleting wallet transactions...')
-            WalletTransaction.objects.all().delete()
+                self.stdout.write('Deleting assistance requests...')
+                AssistanceRequest.objects.all().delete()
 
-            self.stdout.write('Deleting user services (subscriptions)...')
-            UserService.objects.all().delete()
+                self.stdout.write('Deleting wallet transactions...')
+                WalletTransaction.objects.all().delete()
 
-            self.stdout.write('Deleting provider reviews...')
-            ProviderReview.objects.all().delete()
+                self.stdout.write('Deleting user services (subscriptions)...')
+                UserService.objects.all().delete()
 
-            self.stdout.write('Deleting providers...')
-            Provider.objects.all().delete()
+                self.stdout.write('Deleting provider reviews...')
+                ProviderReview.objects.all().delete()
 
-            self.stdout.write('Deleting service plans...')
-            ServicePlan.objects.all().delete()
+                self.stdout.write('Deleting providers...')
+                Provider.objects.all().delete()
 
-            self.stdout.write('Deleting service categories...')
-            ServiceCategory.objects.all().delete()
+                self.stdout.write('Deleting service plans...')
+                ServicePlan.objects.all().delete()
 
-            # Delete all users
-            self.stdout.write('Deleting all users...')
-            User.objects.all().delete()
+                self.stdout.write('Deleting service categories...')
+                ServiceCategory.objects.all().delete()
+
+                # Delete all users
+                self.stdout.write('Deleting all users...')
+                User.objects.all().delete()
 
             # Create admin user
             self.stdout.write('Creating admin user...')
-            admin = User.objects.create_superuser(
-                email='admin@segurifai.com',
-                password='Admin123!',
-                first_name='Admin',
-                last_name='SegurifAI',
-                phone_number='+502 2222 2222',
-                role='ADMIN'
-            )
-            self.stdout.write(self.style.SUCCESS(f'Created admin: {admin.email}'))
+            admin = User.objects.filter(email='admin@segurifai.com').first()
+            if admin:
+                self.stdout.write(f'Admin already exists: {admin.email}')
+            elif options['fast']:
+                hasher = PBKDF2PasswordHasher()
+                admin = User.objects.create(
+                    email='admin@segurifai.com',
+                    password=hasher.encode('Admin123!', hasher.salt(), FAST_PASSWORD_ITERATIONS),
+                    first_name='Admin',
+                    last_name='SegurifAI',
+                    phone_number='+502 2222 2222',
+                    role=User.Role.ADMIN,
+                    is_staff=True,
+                    is_superuser=True
+                )
+                self.stdout.write(self.style.SUCCESS(f'Created admin: {admin.email}'))
+            else:
+                admin = User.objects.create_superuser(
+                    email='admin@segurifai.com',
+                    password='Admin123!',
+                    first_name='Admin',
+                    last_name='SegurifAI',
+                    phone_number='+502 2222 2222',
+                    role=User.Role.ADMIN
+                )
+                self.stdout.write(self.style.SUCCESS(f'Created admin: {admin.email}'))
 
             # Create service categories
             self.stdout.write('Creating service categories...')
 
-            roadside_cat = ServiceCategory.objects.create(
-                name='Asistencia Vial',
-                category_type='ROADSIDE',
-                description='Asistencia en carretera para vehículos en Guatemala',
-                icon='car',
-                is_active=True
-            )
-
-            health_cat = ServiceCategory.objects.create(
-                name='Asistencia Médica',
-                category_type='HEALTH',
-                description='Asistencia médica de emergencia en Guatemala',
-                icon='medical',
-                is_active=True
-            )
-
-            card_cat = ServiceCategory.objects.create(
-                name='Seguro de Tarjeta',
-                category_type='CARD_INSURANCE',
-                description='Protección contra fraude y robo de tarjetas en Guatemala',
-                icon='credit_card',
-                is_active=True
-            )
+            categories = ServiceCategory.objects.bulk_create([
+                ServiceCategory(
+                    name='Asistencia Vial',
+                    category_type=ServiceCategory.CategoryType.ROADSIDE,
+                    description='Asistencia en carretera para vehículos en Guatemala',
+                    icon='car',
+                    is_active=True
+                ),
+                ServiceCategory(
+                    name='Asistencia Médica',
+                    category_type=ServiceCategory.CategoryType.HEALTH,
+                    description='Asistencia médica de emergencia en Guatemala',
+                    icon='medical',
+                    is_active=True
+                ),
+                ServiceCategory(
+                    name='Seguro de Tarjeta',
+                    category_type=ServiceCategory.CategoryType.CARD_INSURANCE,
+                    description='Protección contra fraude y robo de tarjetas en Guatemala',
+                    icon='credit_card',
+                    is_active=True
+                ),
+            ], update_conflicts=True, unique_fields=['category_type'],
+                update_fields=['name', 'description', 'icon', 'is_active'])
+            roadside_cat, health_cat, card_cat = categories
 
             self.stdout.write('Creating service plans (GTQ)...')
 
@@ -211,50 +270,69 @@ class Command(BaseCommand):
                 }
             ]
 
+            # ServicePlan has no unique key, so match existing rows by (category, name)
+            existing_plans = {
+                (plan.category_id, plan.name): plan
+                for plan in ServicePlan.objects.filter(
+                    category__in=[roadside_cat, health_cat, card_cat],
+                    name__in=[plan_data['name'] for plan_data in plans_data],
+                )
+            }
+            plans_to_update = []
+            plans_to_create = []
             for plan_data in plans_data:
-                plan = ServicePlan.objects.create(**plan_data)
-                self.stdout.write(f'  Created plan: {plan.name}')
+                plan = existing_plans.get((plan_data['category'].pk, plan_data['name']))
+                if plan:
+                    for field, value in plan_data.items():
+                        setattr(plan, field, value)
+                    plans_to_update.append(plan)
+                else:
+                    plans_to_create.append(ServicePlan(**plan_data))
+
+            if plans_to_update:
+                ServicePlan.objects.bulk_update(plans_to_update, [
+                    'description', 'price_monthly', 'price_yearly', 'features',
+                    'max_requests_per_month', 'is_featured',
+                ])
+            created_plans = ServicePlan.objects.bulk_create(plans_to_create)
+            self.stdout.write(
+                '  Created plans:\n' + '\n'.join(f'    - {plan.name}' for plan in created_plans)
+                if created_plans else '  No new plans to create'
+            )
+            if plans_to_update:
+                self.stdout.write(
+                    '  Updated plans:\n' + '\n'.join(f'    - {plan.name}' for plan in plans_to_update)
+                )
 
             # Create SegurifAI provider
             self.stdout.write('Creating SegurifAI Guatemala provider...')
-            segurifai_provider = Provider.objects.create(
-                user=admin,
-                company_name='SegurifAI Guatemala',
+            segurifai_provider, _ = Provider.objects.update_or_create(
                 business_license='SegurifAI-GT-2024',
-                tax_id='12345678-9',
-                business_phone='+502 2328 0000',
-                business_email='asistencia@segurifai.com.gt',
-                website='https://www.segurifai.com',
-                address='7a Avenida 5-10, Zona 4, Edificio Centro Financiero',
-                city='Ciudad de Guatemala',
-                state='Guatemala',
-                postal_code='01004',
-                country='Guatemala',
-                latitude=14.6349,
-                longitude=-90.5069,
-                service_radius_km=150,  # 150 km radius - covers most of Guatemala
-                service_areas=['Ciudad de Guatemala', 'Antigua Guatemala', 'Quetzaltenango', 'Escuintla', 'Mixco', 'Villa Nueva'],
-                is_available=True,
-                status='ACTIVE',
-                verification_notes='SegurifAI es una aseguradora global con más de 85 años de experiencia. '
-                    'En Guatemala, ofrecemos servicios de asistencia vial, médica y protección '
-                    'de tarjetas con cobertura nacional 24/7.'
+                defaults=dict(
+                    user=admin,
+                    company_name='SegurifAI Guatemala',
+                    tax_id='12345678-9',
+                    business_phone='+502 2328 0000',
+                    business_email='asistencia@segurifai.com.gt',
+                    website='https://www.segurifai.com',
+                    address='7a Avenida 5-10, Zona 4, Edificio Centro Financiero',
+                    city='Ciudad de Guatemala',
+                    state='Guatemala',
+                    postal_code='01004',
+                    country='Guatemala',
+                    latitude=14.6349,
+                    longitude=-90.5069,
+                    service_radius_km=150,  # 150 km radius - covers most of Guatemala
+                    service_areas=['Ciudad de Guatemala', 'Antigua Guatemala', 'Quetzaltenango', 'Escuintla', 'Mixco', 'Villa Nueva'],
+                    is_available=True,
+                    working_hours=FULL_WEEK_HOURS,
+                    status=Provider.Status.ACTIVE,
+                    verification_notes=SEGURIFAI_VERIFICATION_NOTES,
+                )
             )
 
-            # Set working hours (24/7)
-            segurifai_provider.working_hours = {
-                'monday': {'start': '00:00', 'end': '23:59'},
-                'tuesday': {'start': '00:00', 'end': '23:59'},
-                'wednesday': {'start': '00:00', 'end': '23:59'},
-                'thursday': {'start': '00:00', 'end': '23:59'},
-                'friday': {'start': '00:00', 'end': '23:59'},
-                'saturday': {'start': '00:00', 'end': '23:59'},
-                'sunday': {'start': '00:00', 'end': '23:59'}
-            }
-            segurifai_provider.save()
-
             # Add all service categories to provider
-            segurifai_provider.service_categories.add(roadside_cat, health_cat, card_cat)
+            segurifai_provider.service_categories.add(*categories)
 
             self.stdout.write(self.style.SUCCESS(f'Created provider: {segurifai_provider.company_name}'))
 
@@ -271,8 +349,8 @@ class Command(BaseCommand):
                     f'  Status: {segurifai_provider.status}\n'
                     f'  Location: Ciudad de Guatemala, Guatemala\n'
                     f'  Available: {segurifai_provider.is_available}\n\n'
-                    f'Service Categories: {ServiceCategory.objects.count()}\n'
-                    f'Service Plans: {ServicePlan.objects.count()} plans created (GTQ)\n\n'
+                    f'Service Categories: {len(categories)}\n'
+                    f'Service Plans: {len(created_plans)} created, {len(plans_to_update)} updated (GTQ)\n\n'
                     'PAQ Wallet Integration: Configured\n'
                     '  ID Code: 89E3AF\n'
                     '  Currency: GTQ (Guatemalan Quetzal)\n'
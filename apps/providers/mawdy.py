@@ -8,9 +8,13 @@ MAWDY is the assistance provider for PAQ Wallet offering:
 Contact: 8a. Av. 3-80 Zona 14, Edificio La Rambla II, 5to. Nivel, Guatemala
 Phone: (502) 2285-5070
 """
-from decimal import Decimal
-from typing import Dict, Any, Optional, List
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Any, Optional, List, Tuple, Iterator
 from enum import Enum
+import functools
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -25,223 +29,249 @@ class PlanType(str, Enum):
     HEALTH = 'HEALTH'  # Plan Salud
 
 
-# Plan Drive (Vial) Services
-PLAN_DRIVE_SERVICES = {
-    'GRUA': {
-        'name': 'Grúa del Vehículo',
-        'description': 'Servicio de grúa por accidente o falla mecánica',
-        'events_per_year': 3,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': True,
-    },
-    'COMBUSTIBLE': {
-        'name': 'Abasto de Combustible',
-        'description': '1 galón de combustible - requiere imagen demostrando tanque vacío',
-        'events_per_year': 3,  # Combined with tire/jump start
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': True,
-    },
-    'NEUMATICOS': {
-        'name': 'Cambio de Neumáticos',
-        'description': 'Servicio de cambio de neumático ponchado',
-        'events_per_year': 3,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': False,
-    },
-    'CORRIENTE': {
-        'name': 'Paso de Corriente',
-        'description': 'Servicio de paso de corriente para batería descargada',
-        'events_per_year': 3,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': False,
-    },
-    'CERRAJERIA': {
-        'name': 'Emergencia de Cerrajería',
-        'description': 'Servicio de cerrajería automotriz',
-        'events_per_year': 3,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': False,
-    },
-    'AMBULANCIA_ACCIDENTE': {
-        'name': 'Servicio de Ambulancia',
-        'description': 'Ambulancia por accidente automovilístico',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('100.00'),
-        'requires_evidence': True,
-    },
-    'CONDUCTOR_PROFESIONAL': {
-        'name': 'Conductor Profesional',
-        'description': 'Por enfermedad o embriaguez - 5 horas anticipación, documentos en orden',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('60.00'),
-        'requires_evidence': True,
-    },
-    'TAXI_AEROPUERTO': {
-        'name': 'Taxi al Aeropuerto',
-        'description': 'Por viaje del titular al extranjero',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('60.00'),
-        'requires_evidence': True,
-    },
-    'ASISTENCIA_LEGAL': {
-        'name': 'Asistencia Legal Telefónica',
-        'description': 'Asesoría legal telefónica por accidente',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('200.00'),
-        'requires_evidence': False,
-    },
-    'APOYO_EMERGENCIA': {
-        'name': 'Apoyo Económico Emergencia',
-        'description': 'Apoyo en sala de emergencia por accidente - pago directo al hospital',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('1000.00'),
-        'requires_evidence': True,
-    },
-    'RAYOS_X': {
-        'name': 'Rayos X',
-        'description': 'Estudio de rayos X por accidente',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('300.00'),
-        'requires_evidence': True,
-    },
-    'DESCUENTOS_RED': {
-        'name': 'Descuentos en Red de Proveedores',
-        'description': 'Hasta 20% de descuento en red de proveedores',
-        'events_per_year': None,  # Unlimited
-        'economic_limit_usd': None,
-        'requires_evidence': False,
-    },
-    'ASISTENTE_REPUESTOS': {
-        'name': 'Asistente Telefónico Repuestos',
-        'description': 'Cotización de repuestos y referencias mecánicas',
-        'events_per_year': None,
-        'economic_limit_usd': None,
-        'requires_evidence': False,
-    },
-    'ASISTENTE_MEDICO': {
-        'name': 'Asistente Telefónico Médico',
-        'description': 'Referencias médicas por accidente automovilístico',
-        'events_per_year': None,
-        'economic_limit_usd': None,
-        'requires_evidence': False,
-    },
-}
+@dataclass(frozen=True, slots=True)
+class ServiceDefinition:
+    """A single MAWDY service and its coverage limits."""
+    name: str
+    description: str
+    events_per_year: Optional[int]  # None = unlimited
+    economic_limit_usd: Optional[Decimal]  # None = no economic limit
+    requires_evidence: bool
+    family_coverage: bool = False
+
+
+# Shared economic limits (USD) referenced by the service definitions below
+_D60 = Decimal('60.00')
+_D100 = Decimal('100.00')
+_D150 = Decimal('150.00')
+_D200 = Decimal('200.00')
+_D300 = Decimal('300.00')
+_D1000 = Decimal('1000.00')
+
+
+# Plan Drive (Vial) Services, built on first use
+@functools.cache
+def get_drive_services() -> Dict[str, ServiceDefinition]:
+    return {
+        'GRUA': ServiceDefinition(
+            name='Grúa del Vehículo',
+            description='Servicio de grúa por accidente o falla mecánica',
+            events_per_year=3,
+            economic_limit_usd=_D150,
+            requires_evidence=True,
+        ),
+        'COMBUSTIBLE': ServiceDefinition(
+            name='Abasto de Combustible',
+            description='1 galón de combustible - requiere imagen demostrando tanque vacío',
+            events_per_year=3,  # Combined with tire/jump start
+            economic_limit_usd=_D150,
+            requires_evidence=True,
+        ),
+        'NEUMATICOS': ServiceDefinition(
+            name='Cambio de Neumáticos',
+            description='Servicio de cambio de neumático ponchado',
+            events_per_year=3,
+            economic_limit_usd=_D150,
+            requires_evidence=False,
+        ),
+        'CORRIENTE': ServiceDefinition(
+            name='Paso de Corriente',
+            description='Servicio de paso de corriente para batería descargada',
+            events_per_year=3,
+            economic_limit_usd=_D150,
+            requires_evidence=False,
+        ),
+        'CERRAJERIA': ServiceDefinition(
+            name='Emergencia de Cerrajería',
+            description='Servicio de cerrajería automotriz',
+            events_per_year=3,
+            economic_limit_usd=_D150,
+            requires_evidence=False,
+        ),
+        'AMBULANCIA_ACCIDENTE': ServiceDefinition(
+            name='Servicio de Ambulancia',
+            description='Ambulancia por accidente automovilístico',
+            events_per_year=1,
+            economic_limit_usd=_D100,
+            requires_evidence=True,
+        ),
+        'CONDUCTOR_PROFESIONAL': ServiceDefinition(
+            name='Conductor Profesional',
+            description='Por enfermedad o embriaguez - 5 horas anticipación, documentos en orden',
+            events_per_year=1,
+            economic_limit_usd=_D60,
+            requires_evidence=True,
+        ),
+        'TAXI_AEROPUERTO': ServiceDefinition(
+            name='Taxi al Aeropuerto',
+            description='Por viaje del titular al extranjero',
+            events_per_year=1,
+            economic_limit_usd=_D60,
+            requires_evidence=True,
+        ),
+        'ASISTENCIA_LEGAL': ServiceDefinition(
+            name='Asistencia Legal Telefónica',
+            description='Asesoría legal telefónica por accidente',
+            events_per_year=1,
+            economic_limit_usd=_D200,
+            requires_evidence=False,
+        ),
+        'APOYO_EMERGENCIA': ServiceDefinition(
+            name='Apoyo Económico Emergencia',
+            description='Apoyo en sala de emergencia por accidente - pago directo al hospital',
+            events_per_year=1,
+            economic_limit_usd=_D1000,
+            requires_evidence=True,
+        ),
+        'RAYOS_X': ServiceDefinition(
+            name='Rayos X',
+            description='Estudio de rayos X por accidente',
+            events_per_year=1,
+            economic_limit_usd=_D300,
+            requires_evidence=True,
+        ),
+        'DESCUENTOS_RED': ServiceDefinition(
+            name='Descuentos en Red de Proveedores',
+            description='Hasta 20% de descuento en red de proveedores',
+            events_per_year=None,  # Unlimited
+            economic_limit_usd=None,
+            requires_evidence=False,
+        ),
+        'ASISTENTE_REPUESTOS': ServiceDefinition(
+            name='Asistente Telefónico Repuestos',
+            description='Cotización de repuestos y referencias mecánicas',
+            events_per_year=None,
+            economic_limit_usd=None,
+            requires_evidence=False,
+        ),
+        'ASISTENTE_MEDICO': ServiceDefinition(
+            name='Asistente Telefónico Médico',
+            description='Referencias médicas por accidente automovilístico',
+            events_per_year=None,
+            economic_limit_usd=None,
+            requires_evidence=False,
+        ),
+    }
+
+
+# Plan Health (Salud) Services, built on first use
+@functools.cache
+def get_health_services() -> Dict[str, ServiceDefinition]:
+    return {
+        'ORIENTACION_MEDICA': ServiceDefinition(
+            name='Orientación Médica Telefónica',
+            description='Orientación médica por teléfono 24/7',
+            events_per_year=None,
+            economic_limit_usd=None,
+            requires_evidence=False,
+            family_coverage=True,
+        ),
+        'CONEXION_ESPECIALISTAS': ServiceDefinition(
+            name='Conexión con Especialistas',
+            description='Conexión con especialistas de la red médica',
+            events_per_year=None,
+            economic_limit_usd=None,
+            requires_evidence=False,
+            family_coverage=True,
+        ),
+        'CONSULTA_PRESENCIAL': ServiceDefinition(
+            name='Consulta Presencial',
+            description='Médico general, ginecólogo o pediatra - grupo familiar',
+            events_per_year=3,
+            economic_limit_usd=_D150,
+            requires_evidence=False,
+            family_coverage=True,
+        ),
+        'MEDICAMENTOS_DOMICILIO': ServiceDefinition(
+            name='Coordinación Medicamentos',
+            description='Coordinación de entrega de medicamentos al domicilio',
+            events_per_year=None,
+            economic_limit_usd=None,
+            requires_evidence=False,
+            family_coverage=False,
+        ),
+        'CUIDADOS_POST_OP': ServiceDefinition(
+            name='Cuidados Post Operatorios',
+            description='Servicio de enfermera post operatorio',
+            events_per_year=1,
+            economic_limit_usd=_D100,
+            requires_evidence=True,
+            family_coverage=False,
+        ),
+        'ARTICULOS_HOSPITALIZACION': ServiceDefinition(
+            name='Artículos de Aseo Personal',
+            description='Envío de artículos por hospitalización',
+            events_per_year=1,
+            economic_limit_usd=_D100,
+            requires_evidence=True,
+            family_coverage=False,
+        ),
+        'LABORATORIO_BASICO': ServiceDefinition(
+            name='Exámenes de Laboratorio Básicos',
+            description='Heces, orina y hematología completa - grupo familiar',
+            events_per_year=2,
+            economic_limit_usd=_D100,
+            requires_evidence=False,
+            family_coverage=True,
+        ),
+        'LABORATORIO_ESPECIALIZADO': ServiceDefinition(
+            name='Exámenes Especializados',
+            description='Papanicolau, mamografía o antígeno prostático - titular',
+            events_per_year=2,
+            economic_limit_usd=_D100,
+            requires_evidence=False,
+            family_coverage=False,
+        ),
+        'NUTRICIONISTA': ServiceDefinition(
+            name='Nutricionista Video Consulta',
+            description='Consulta con nutricionista por video - grupo familiar',
+            events_per_year=4,
+            economic_limit_usd=_D150,
+            requires_evidence=False,
+            family_coverage=True,
+        ),
+        'PSICOLOGIA': ServiceDefinition(
+            name='Psicología Video Consulta',
+            description='Consulta psicológica por video - núcleo familiar',
+            events_per_year=4,
+            economic_limit_usd=_D150,
+            requires_evidence=False,
+            family_coverage=True,
+        ),
+        'MENSAJERIA_HOSPITALIZACION': ServiceDefinition(
+            name='Servicio de Mensajería',
+            description='Mensajería por hospitalización de emergencia',
+            events_per_year=2,
+            economic_limit_usd=_D60,
+            requires_evidence=True,
+            family_coverage=False,
+        ),
+        'TAXI_FAMILIAR': ServiceDefinition(
+            name='Taxi para Familiar',
+            description='Por hospitalización del titular - 15km perímetro capital',
+            events_per_year=2,
+            economic_limit_usd=_D100,
+            requires_evidence=True,
+            family_coverage=False,
+        ),
+        'AMBULANCIA_ACCIDENTE': ServiceDefinition(
+            name='Traslado en Ambulancia',
+            description='Por accidente del titular',
+            events_per_year=2,
+            economic_limit_usd=_D150,
+            requires_evidence=True,
+            family_coverage=False,
+        ),
+        'TAXI_ALTA': ServiceDefinition(
+            name='Taxi tras Alta Hospitalización',
+            description='Al domicilio tras alta - 15km perímetro capital',
+            events_per_year=1,
+            economic_limit_usd=_D100,
+            requires_evidence=True,
+            family_coverage=False,
+        ),
+    }
 
-# Plan Health (Salud) Services
-PLAN_HEALTH_SERVICES = {
-    'ORIENTACION_MEDICA': {
-        'name': 'Orientación Médica Telefónica',
-        'description': 'Orientación médica por teléfono 24/7',
-        'events_per_year': None,
-        'economic_limit_usd': None,
-        'requires_evidence': False,
-        'family_coverage': True,
-    },
-    'CONEXION_ESPECIALISTAS': {
-        'name': 'Conexión con Especialistas',
-        'description': 'Conexión con especialistas de la red médica',
-        'events_per_year': None,
-        'economic_limit_usd': None,
-        'requires_evidence': False,
-        'family_coverage': True,
-    },
-    'CONSULTA_PRESENCIAL': {
-        'name': 'Consulta Presencial',
-        'description': 'Médico general, ginecólogo o pediatra - grupo familiar',
-        'events_per_year': 3,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': False,
-        'family_coverage': True,
-    },
-    'MEDICAMENTOS_DOMICILIO': {
-        'name': 'Coordinación Medicamentos',
-        'description': 'Coordinación de entrega de medicamentos al domicilio',
-        'events_per_year': None,
-        'economic_limit_usd': None,
-        'requires_evidence': False,
-        'family_coverage': False,
-    },
-    'CUIDADOS_POST_OP': {
-        'name': 'Cuidados Post Operatorios',
-        'description': 'Servicio de enfermera post operatorio',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('100.00'),
-        'requires_evidence': True,
-        'family_coverage': False,
-    },
-    'ARTICULOS_HOSPITALIZACION': {
-        'name': 'Artículos de Aseo Personal',
-        'description': 'Envío de artículos por hospitalización',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('100.00'),
-        'requires_evidence': True,
-        'family_coverage': False,
-    },
-    'LABORATORIO_BASICO': {
-        'name': 'Exámenes de Laboratorio Básicos',
-        'description': 'Heces, orina y hematología completa - grupo familiar',
-        'events_per_year': 2,
-        'economic_limit_usd': Decimal('100.00'),
-        'requires_evidence': False,
-        'family_coverage': True,
-    },
-    'LABORATORIO_ESPECIALIZADO': {
-        'name': 'Exámenes Especializados',
-        'description': 'Papanicolau, mamografía o antígeno prostático - titular',
-        'events_per_year': 2,
-        'economic_limit_usd': Decimal('100.00'),
-        'requires_evidence': False,
-        'family_coverage': False,
-    },
-    'NUTRICIONISTA': {
-        'name': 'Nutricionista Video Consulta',
-        'description': 'Consulta con nutricionista por video - grupo familiar',
-        'events_per_year': 4,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': False,
-        'family_coverage': True,
-    },
-    'PSICOLOGIA': {
-        'name': 'Psicología Video Consulta',
-        'description': 'Consulta psicológica por video - núcleo familiar',
-        'events_per_year': 4,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': False,
-        'family_coverage': True,
-    },
-    'MENSAJERIA_HOSPITALIZACION': {
-        'name': 'Servicio de Mensajería',
-        'description': 'Mensajería por hospitalización de emergencia',
-        'events_per_year': 2,
-        'economic_limit_usd': Decimal('60.00'),
-        'requires_evidence': True,
-        'family_coverage': False,
-    },
-    'TAXI_FAMILIAR': {
-        'name': 'Taxi para Familiar',
-        'description': 'Por hospitalización del titular - 15km perímetro capital',
-        'events_per_year': 2,
-        'economic_limit_usd': Decimal('100.00'),
-        'requires_evidence': True,
-        'family_coverage': False,
-    },
-    'AMBULANCIA_ACCIDENTE': {
-        'name': 'Traslado en Ambulancia',
-        'description': 'Por accidente del titular',
-        'events_per_year': 2,
-        'economic_limit_usd': Decimal('150.00'),
-        'requires_evidence': True,
-        'family_coverage': False,
-    },
-    'TAXI_ALTA': {
-        'name': 'Taxi tras Alta Hospitalización',
-        'description': 'Al domicilio tras alta - 15km perímetro capital',
-        'events_per_year': 1,
-        'economic_limit_usd': Decimal('100.00'),
-        'requires_evidence': True,
-        'family_coverage': False,
-    },
-}
 
 # Exchange Rate (November 2025)
 USD_TO_GTQ = Decimal('7.75')
@@ -258,37 +288,144 @@ PLAN_PRICING_USD = {
     },
 }
 
-# Pricing (GTQ - Guatemalan Quetzales)
+# Pricing (GTQ - Guatemalan Quetzales), derived from USD at the exchange rate above
 PLAN_PRICING_GTQ = {
-    'DRIVE': {
-        'inclusion': {'monthly': Decimal('24.41'), 'annual': Decimal('292.95')},  # 3.15 * 7.75
-        'optional': {'monthly': Decimal('29.06'), 'annual': Decimal('348.75')},   # 3.75 * 7.75
-    },
-    'HEALTH': {
-        'inclusion': {'monthly': Decimal('22.48'), 'annual': Decimal('269.70')},  # 2.90 * 7.75
-        'optional': {'monthly': Decimal('26.74'), 'annual': Decimal('320.85')},   # 3.45 * 7.75
-    },
+    plan: {
+        tier: {
+            period: (amount * USD_TO_GTQ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            for period, amount in periods.items()
+        }
+        for tier, periods in tiers.items()
+    }
+    for plan, tiers in PLAN_PRICING_USD.items()
 }
 
 # Combined pricing (backwards compatibility)
 PLAN_PRICING = PLAN_PRICING_USD
 
+# Float views of the pricing tables, as served by the API
+_PLAN_PRICING_FLOAT = {
+    currency: {
+        plan: {
+            tier: {period: float(amount) for period, amount in periods.items()}
+            for tier, periods in tiers.items()
+        }
+        for plan, tiers in pricing.items()
+    }
+    for currency, pricing in (('USD', PLAN_PRICING_USD), ('GTQ', PLAN_PRICING_GTQ))
+}
+_EXCHANGE_RATE_FLOAT = float(USD_TO_GTQ)
+
+
+@functools.cache
+def get_service_limit_usd_float() -> Dict[str, Dict[str, Optional[float]]]:
+    """Economic limits per plan and service code as floats for JSON output (None = no limit)."""
+    return {
+        plan_type: {
+            code: float(service.economic_limit_usd) if service.economic_limit_usd else None
+            for code, service in services.items()
+        }
+        for plan_type, services in (('DRIVE', get_drive_services()), ('HEALTH', get_health_services()))
+    }
+
+
+@functools.cache
+def get_plan_meta() -> Dict[str, Dict[str, int]]:
+    """Service counts per plan type."""
+    meta = {}
+    for plan_type, services in (('DRIVE', get_drive_services()), ('HEALTH', get_health_services())):
+        service_count = sum(1 for service in services.values() if service.events_per_year is not None)
+        meta[plan_type] = {
+            'service_count': service_count,
+            'unlimited_count': len(services) - service_count,
+            'total': len(services),
+        }
+    return meta
+
+
+@functools.cache
+def _plan_service_static() -> Dict[str, Tuple[Tuple[str, str, str, Optional[int], str], ...]]:
+    """Per-plan (code, name, description, events_limit, economic_limit_usd str) rows."""
+    return {
+        plan_type: tuple(
+            (code, service.name, service.description, service.events_per_year, str(service.economic_limit_usd))
+            for code, service in services.items()
+        )
+        for plan_type, services in (('DRIVE', get_drive_services()), ('HEALTH', get_health_services()))
+    }
+
+
 # Business Rules
-BUSINESS_RULES = {
-    'vehicle_max_age_years': 20,
-    'vehicle_max_weight_tons': 3.5,
-    'vehicle_use': 'particular',  # Personal use only
-    'geographic_area': 'Guatemala',
-    'quote_validity_days': 45,
-    'min_subscribers_drive': 500,  # Minimum for optional plan
-    'min_subscribers_health': 350,
-    'cost_review_frequency': 'semestral',
-    'max_cost_ratio': 0.50,  # 50% - triggers price adjustment
-    'no_reimbursements': True,
-    'call_center_required': True,
+@dataclass(frozen=True, slots=True)
+class BusinessRules:
+    vehicle_max_age_years: int = 20
+    vehicle_max_weight_tons: float = 3.5
+    vehicle_use: str = 'particular'  # Personal use only
+    geographic_area: str = 'Guatemala'
+    quote_validity_days: int = 45
+    min_subscribers_drive: int = 500  # Minimum for optional plan
+    min_subscribers_health: int = 350
+    cost_review_frequency: str = 'semestral'
+    max_cost_ratio: float = 0.50  # 50% - triggers price adjustment
+    no_reimbursements: bool = True
+    call_center_required: bool = True
+
+
+BUSINESS_RULES = BusinessRules()
+
+# Plan Drive vehicle eligibility: (predicate over age, weight and use, rejection reason)
+_ELIGIBILITY_RULES = (
+    (
+        lambda age, weight, use: age > BUSINESS_RULES.vehicle_max_age_years,
+        f'Vehículo excede {BUSINESS_RULES.vehicle_max_age_years} años de antigüedad',
+    ),
+    (
+        lambda age, weight, use: weight > BUSINESS_RULES.vehicle_max_weight_tons,
+        f'Vehículo excede {BUSINESS_RULES.vehicle_max_weight_tons} toneladas',
+    ),
+    (
+        lambda age, weight, use: use != BUSINESS_RULES.vehicle_use,
+        'Solo vehículos de uso particular',
+    ),
+)
+
+
+def _vehicle_rejection_reasons(vehicle_age_years: int, weight_tons: float, use_type: str) -> List[str]:
+    return [
+        reason for rule, reason in _ELIGIBILITY_RULES
+        if rule(vehicle_age_years, weight_tons, use_type)
+    ]
+
+
+def _get_mawdy_category():
+    """Asistencia Vial (id 1), the category MAWDY requests are filed under"""
+    from apps.services.models import ServiceCategory
+
+    category, _ = ServiceCategory.objects.get_or_create(
+        id=1,
+        defaults={
+            'name': 'Asistencia Vial',
+            'description': 'Servicios de asistencia vial MAWDY',
+        }
+    )
+    return category
+
+
+# Legacy module attributes, resolved lazily (PEP 562) so importing this module
+# does not build the service tables
+_LAZY_ATTRIBUTES = {
+    'PLAN_DRIVE_SERVICES': get_drive_services,
+    'PLAN_HEALTH_SERVICES': get_health_services,
 }
 
 
+def __getattr__(name: str) -> Any:
+    loader = _LAZY_ATTRIBUTES.get(name)
+    if loader is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    return loader()
+
+
 # =============================================================================
 # MAWDY SERVICE CLASS
 # =============================================================================
@@ -302,15 +439,23 @@ class MAWDYService:
     CONTACT_PHONE = '+502 2285-5070'
     ADDRESS = '8a. Av. 3-80 Zona 14, Edificio La Rambla II, 5to. Nivel Oficina 5-2, Guatemala'
 
+    # Request statuses that count against a service's yearly event limit
+    USAGE_STATUSES = ['COMPLETED', 'IN_PROGRESS', 'ASSIGNED']
+
     @classmethod
-    def get_plan_services(cls, plan_type: str) -> Dict[str, Any]:
+    def get_plan_services(cls, plan_type: str) -> Dict[str, ServiceDefinition]:
         """Get all services for a plan type."""
         if plan_type == 'DRIVE':
-            return PLAN_DRIVE_SERVICES
+            return get_drive_services()
         elif plan_type == 'HEALTH':
-            return PLAN_HEALTH_SERVICES
+            return get_health_services()
         return {}
 
+    @classmethod
+    def get_plan_meta(cls, plan_type: str) -> Dict[str, int]:
+        """Get limited, unlimited and total service counts for a plan."""
+        return get_plan_meta()[plan_type]
+
     @classmethod
     def get_plan_pricing(cls, plan_type: str, tier: str = 'optional', currency: str = 'USD') -> Dict[str, Decimal]:
         """Get pricing for a plan in specified currency."""
@@ -321,40 +466,38 @@ class MAWDYService:
     def get_all_pricing(cls, plan_type: str) -> Dict[str, Any]:
         """Get pricing in both USD and GTQ for a plan."""
         return {
-            'USD': {
-                'inclusion': {k: float(v) for k, v in PLAN_PRICING_USD[plan_type]['inclusion'].items()},
-                'optional': {k: float(v) for k, v in PLAN_PRICING_USD[plan_type]['optional'].items()},
-            },
-            'GTQ': {
-                'inclusion': {k: float(v) for k, v in PLAN_PRICING_GTQ[plan_type]['inclusion'].items()},
-                'optional': {k: float(v) for k, v in PLAN_PRICING_GTQ[plan_type]['optional'].items()},
-            },
-            'exchange_rate': float(USD_TO_GTQ),
+            'USD': _PLAN_PRICING_FLOAT['USD'][plan_type],
+            'GTQ': _PLAN_PRICING_FLOAT['GTQ'][plan_type],
+            'exchange_rate': _EXCHANGE_RATE_FLOAT,
+        }
+
+    @classmethod
+    def get_pricing_table(cls) -> Dict[str, Any]:
+        """Get pricing for every plan in both USD and GTQ."""
+        return {
+            'USD': _PLAN_PRICING_FLOAT['USD'],
+            'GTQ': _PLAN_PRICING_FLOAT['GTQ'],
+            'exchange_rate': _EXCHANGE_RATE_FLOAT,
         }
 
     @classmethod
     def check_vehicle_eligibility(cls, vehicle_age_years: int, weight_tons: float, use_type: str) -> Dict[str, Any]:
         """Check if a vehicle is eligible for Plan Drive."""
-        eligible = True
-        reasons = []
-
-        if vehicle_age_years > BUSINESS_RULES['vehicle_max_age_years']:
-            eligible = False
-            reasons.append(f'Vehículo excede {BUSINESS_RULES["vehicle_max_age_years"]} años de antigüedad')
-
-        if weight_tons > BUSINESS_RULES['vehicle_max_weight_tons']:
-            eligible = False
-            reasons.append(f'Vehículo excede {BUSINESS_RULES["vehicle_max_weight_tons"]} toneladas')
-
-        if use_type != 'particular':
-            eligible = False
-            reasons.append('Solo vehículos de uso particular')
+        reasons = _vehicle_rejection_reasons(vehicle_age_years, weight_tons, use_type)
+        eligible = not reasons
 
         return {
             'eligible': eligible,
             'reasons': reasons if not eligible else ['Vehículo elegible para Plan Drive']
         }
 
+    @staticmethod
+    def _year_range(year: int) -> Tuple[datetime, datetime]:
+        """Aware [start, end) bounds of a calendar year in the current time zone."""
+        from django.utils import timezone
+
+        return timezone.make_aware(datetime(year, 1, 1)), timezone.make_aware(datetime(year + 1, 1, 1))
+
     @classmethod
     def check_service_availability(
         cls,
@@ -384,23 +527,25 @@ class MAWDYService:
                 'reason': 'Servicio no encontrado'
             }
 
-        events_limit = service.get('events_per_year')
+        events_limit = service.events_per_year
 
         if events_limit is None:
             # Unlimited service
             return {
                 'available': True,
                 'remaining_events': 'Ilimitado',
-                'economic_limit': service.get('economic_limit_usd')
+                'economic_limit': service.economic_limit_usd
             }
 
         # Check user's usage for this year
         from apps.assistance.models import AssistanceRequest
+        year_start, year_end = cls._year_range(year)
         usage_count = AssistanceRequest.objects.filter(
             user_id=user_id,
             service_category__category_type=service_code,
-            created_at__year=year,
-            status__in=['COMPLETED', 'IN_PROGRESS', 'ASSIGNED']
+            created_at__gte=year_start,
+            created_at__lt=year_end,
+            status__in=cls.USAGE_STATUSES
         ).count()
 
         remaining = events_limit - usage_count
@@ -410,7 +555,7 @@ class MAWDYService:
             'events_used': usage_count,
             'events_limit': events_limit,
             'remaining_events': max(0, remaining),
-            'economic_limit': service.get('economic_limit_usd'),
+            'economic_limit': service.economic_limit_usd,
             'reason': None if remaining > 0 else f'Límite de {events_limit} eventos anuales alcanzado'
         }
 
@@ -430,6 +575,7 @@ class MAWDYService:
         In production, this would integrate with MAWDY's call center system.
         Currently, it creates a request that can be managed through the admin.
         """
+        from django.db import transaction
         from django.utils import timezone
         from apps.assistance.models import AssistanceRequest
 
@@ -439,50 +585,44 @@ class MAWDYService:
         if not service:
             return {'success': False, 'error': 'Servicio no válido'}
 
-        # Check availability
-        availability = cls.check_service_availability(
-            user.id, plan_type, service_code, timezone.now().year
-        )
+        with transaction.atomic():
+            # Lock the user's row so concurrent requests from the same user
+            # are counted and inserted one at a time
+            type(user).objects.select_for_update().only('pk').get(pk=user.pk)
 
-        if not availability['available']:
-            return {
-                'success': False,
-                'error': availability['reason']
-            }
-
-        # Check evidence requirement
-        if service.get('requires_evidence') and not evidence_files:
-            return {
-                'success': False,
-                'error': 'Este servicio requiere evidencia fotográfica'
-            }
-
-        # Create request - use incident_type to store service info
-        # Get or create MAWDY service category (Asistencia Vial = id 1)
-        from apps.services.models import ServiceCategory
-        try:
-            service_cat = ServiceCategory.objects.get(id=1)  # Asistencia Vial
-        except ServiceCategory.DoesNotExist:
-            service_cat = ServiceCategory.objects.create(
-                id=1,
-                name='Asistencia Vial',
-                description='Servicios de asistencia vial MAWDY'
+            # Check availability
+            availability = cls.check_service_availability(
+                user.id, plan_type, service_code, timezone.now().year
             )
 
-        request = AssistanceRequest.objects.create(
-            user=user,
-            service_category=service_cat,
-            title=service['name'],
-            description=f"[{plan_type}:{service_code}] {description}",
-            incident_type=f"MAWDY_{service_code}",
-            location_address=location.get('address', ''),
-            location_city=location.get('city', 'Guatemala'),
-            location_state=location.get('state', 'Guatemala'),
-            location_latitude=location.get('latitude'),
-            location_longitude=location.get('longitude'),
-            status='PENDING',
-            estimated_cost=service.get('economic_limit_usd'),
-        )
+            if not availability['available']:
+                return {
+                    'success': False,
+                    'error': availability['reason']
+                }
+
+            # Check evidence requirement
+            if service.requires_evidence and not evidence_files:
+                return {
+                    'success': False,
+                    'error': 'Este servicio requiere evidencia fotográfica'
+                }
+
+            # Create request - use incident_type to store service info
+            request = AssistanceRequest.objects.create(
+                user=user,
+                service_category=_get_mawdy_category(),
+                title=service.name,
+                description=f"[{plan_type}:{service_code}] {description}",
+                incident_type=f"MAWDY_{service_code}",
+                location_address=location.get('address', ''),
+                location_city=location.get('city', 'Guatemala'),
+                location_state=location.get('state', 'Guatemala'),
+                location_latitude=location.get('latitude'),
+                location_longitude=location.get('longitude'),
+                status='PENDING',
+                estimated_cost=service.economic_limit_usd,
+            )
 
         logger.info(f'MAWDY service request created: {request.request_number} - {service_code}')
 
@@ -490,29 +630,75 @@ class MAWDYService:
             'success': True,
             'request_id': request.id,
             'request_number': request.request_number,
-            'service': service['name'],
-            'economic_limit': str(service.get('economic_limit_usd', 'N/A')),
+            'service': service.name,
+            'economic_limit': str(service.economic_limit_usd),
             'contact_phone': cls.CONTACT_PHONE,
             'message': 'Solicitud creada. Un agente de MAWDY se comunicará contigo pronto.'
         }
 
+    @classmethod
+    def _bulk_usage_counts(cls, user_id: int, codes: List[str], year: int) -> Dict[str, int]:
+        """Count a user's requests per service code for the year in a single query."""
+        from django.db.models import Count
+        from apps.assistance.models import AssistanceRequest
+
+        year_start, year_end = cls._year_range(year)
+        rows = AssistanceRequest.objects.filter(
+            user_id=user_id,
+            service_category__category_type__in=codes,
+            created_at__gte=year_start,
+            created_at__lt=year_end,
+            status__in=cls.USAGE_STATUSES
+        ).order_by().values_list('service_category__category_type').annotate(count=Count('id'))
+
+        # One (category_type, count) tuple per service code used; no model instances
+        return dict(rows)
+
+    @classmethod
+    def iter_user_usage_summary(cls, user_id: int, plan_type: str, year: int) -> Iterator[Dict[str, Any]]:
+        """
+        Summary of user's service usage for the year, one service at a time.
+
+        The usage counts are queried up front; rows are built as they are consumed.
+        """
+        rows = _plan_service_static().get(plan_type, ())
+        limited_codes = [code for code, _, _, events_limit, _ in rows if events_limit is not None]
+        usage = cls._bulk_usage_counts(user_id, limited_codes, year) if limited_codes else {}
+
+        return (
+            cls._usage_entry(code, name, description, events_limit, economic_limit, usage.get(code, 0))
+            for code, name, description, events_limit, economic_limit in rows
+        )
+
+    @staticmethod
+    def _usage_entry(code, name, description, events_limit, economic_limit, events_used) -> Dict[str, Any]:
+        return {
+            'service_code': code,
+            'service_name': name,
+            'description': description,
+            'events_limit': events_limit,
+            'events_used': events_used,
+            'remaining': 'Ilimitado' if events_limit is None else max(0, events_limit - events_used),
+            'economic_limit_usd': economic_limit,
+            'available': events_limit is None or events_limit > events_used,
+        }
+
     @classmethod
     def get_user_usage_summary(cls, user_id: int, plan_type: str, year: int) -> List[Dict[str, Any]]:
         """Get summary of user's service usage for the year."""
-        services = cls.get_plan_services(plan_type)
-        summary = []
-
-        for code, service in services.items():
-            availability = cls.check_service_availability(user_id, plan_type, code, year)
-            summary.append({
-                'service_code': code,
-                'service_name': service['name'],
-                'description': service['description'],
-                'events_limit': service.get('events_per_year', 'Ilimitado'),
-                'events_used': availability.get('events_used', 0),
-                'remaining': availability.get('remaining_events', 'Ilimitado'),
-                'economic_limit_usd': str(service.get('economic_limit_usd', 'N/A')),
-                'available': availability['available'],
-            })
-
-        return summary
+        return list(cls.iter_user_usage_summary(user_id, plan_type, year))
+
+
+@functools.cache
+def get_catalog_etag() -> str:
+    """ETag for the static MAWDY catalog (plans, services, pricing and rules)."""
+    catalog = repr((
+        get_drive_services(),
+        get_health_services(),
+        PLAN_PRICING_USD,
+        PLAN_PRICING_GTQ,
+        BUSINESS_RULES,
+        MAWDYService.CONTACT_PHONE,
+        MAWDYService.ADDRESS,
+    ))
+    return '"%s"' % hashlib.md5(catalog.encode(), usedforsecurity=False).hexdigest()
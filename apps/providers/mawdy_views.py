@@ -3,26 +3,146 @@ MAWDY API Views for SegurifAI x PAQ
 
 Endpoints for interacting with MAWDY assistance services.
 """
+from dataclasses import asdict
+import functools
+import json
+
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import etag
 
 from .mawdy import (
     MAWDYService,
-    PLAN_DRIVE_SERVICES,
-    PLAN_HEALTH_SERVICES,
-    PLAN_PRICING_USD,
-    PLAN_PRICING_GTQ,
-    USD_TO_GTQ,
     BUSINESS_RULES,
+    get_catalog_etag,
+    get_service_limit_usd_float,
 )
 from apps.users.permissions import IsAdmin
 
+# Browser cache lifetime for the static catalog endpoints (1 hour)
+CATALOG_MAX_AGE = 60 * 60
+
+
+def _catalog_etag(request, *args, **kwargs):
+    return get_catalog_etag()
+
+
+def catalog_cache(view_func):
+    """
+    Conditional GET and private caching for views serving the static catalog.
+
+    Applied inside @api_view so authentication and permissions run first.
+    Only 200 (and the 304 answering it) keep the ETag and get Cache-Control,
+    so error responses such as an invalid plan_type are never cached.
+    """
+    conditional_view = etag(_catalog_etag)(view_func)
+
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = conditional_view(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            patch_cache_control(response, private=True, max_age=CATALOG_MAX_AGE)
+        else:
+            response.headers.pop('ETag', None)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    return wrapper
+
+
+def _render_json(data):
+    """Encode like DRF's JSONRenderer (compact separators, UTF-8)."""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+@functools.cache
+def _contact_info_json():
+    """Encoded get_contact_info body."""
+    return _render_json({
+        'provider': 'MAWDY',
+        'phone': MAWDYService.CONTACT_PHONE,
+        'address': MAWDYService.ADDRESS,
+        'service_hours': '24/7',
+        'geographic_coverage': 'Guatemala',
+        'emergency_line': '+502 2285-5070',
+        'instructions': [
+            'Todos los servicios deben solicitarse a través de la central telefónica',
+            'No se operan reembolsos',
+            'Tenga a mano su número de póliza y documentos del vehículo',
+        ]
+    })
+
+
+@functools.cache
+def _business_rules_json():
+    """Encoded get_business_rules body."""
+    return _render_json({
+        'business_rules': asdict(BUSINESS_RULES),
+        'pricing': MAWDYService.get_pricing_table(),
+    })
+
+
+def _stream_usage(envelope, services):
+    """
+    Stream a usage body: the envelope fields, then the services one by one.
+
+    Produces the same bytes as rendering {**envelope, 'services': [...]}.
+    """
+    yield _render_json(envelope)[:-1] + b',"services":['
+    for i, service in enumerate(services):
+        yield (b',' if i else b'') + _render_json(service)
+    yield b']}'
+
+
+def _build_plan_summary(plan_type):
+    """Pricing and service counts for one plan, as listed by get_mawdy_plans."""
+    meta = MAWDYService.get_plan_meta(plan_type)
+
+    return {
+        'plan_type': plan_type,
+        'name': 'Plan Drive' if plan_type == 'DRIVE' else 'Plan Health',
+        'description': 'Asistencia Vial' if plan_type == 'DRIVE' else 'Asistencia de Salud',
+        'pricing': MAWDYService.get_all_pricing(plan_type),
+        'services_with_limit': meta['service_count'],
+        'unlimited_services': meta['unlimited_count'],
+        'total_services': meta['total'],
+    }
+
+
+@functools.cache
+def _build_services_response(plan_type):
+    """Response body for a plan's service listing (built once per plan type)."""
+    services = MAWDYService.get_plan_services(plan_type)
+    limits = get_service_limit_usd_float()[plan_type]
+    services_list = [
+        {
+            'service_code': code,
+            'name': service.name,
+            'description': service.description,
+            'events_per_year': service.events_per_year,
+            'economic_limit_usd': limits[code],
+            'requires_evidence': service.requires_evidence,
+            'family_coverage': service.family_coverage,
+        }
+        for code, service in services.items()
+    ]
+
+    return {
+        'plan_type': plan_type,
+        'plan_name': 'Plan Drive' if plan_type == 'DRIVE' else 'Plan Health',
+        'services': services_list,
+        'total': len(services_list)
+    }
+
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@catalog_cache
 def get_mawdy_plans(request):
     """
     Get available MAWDY plans and pricing.
@@ -32,43 +152,7 @@ def get_mawdy_plans(request):
     plans = []
 
     for plan_type in ['DRIVE', 'HEALTH']:
-        services = MAWDYService.get_plan_services(plan_type)
-        service_count = len([s for s in services.values() if s.get('events_per_year') is not None])
-        unlimited_count = len([s for s in services.values() if s.get('events_per_year') is None])
-        pricing_usd = PLAN_PRICING_USD[plan_type]
-        pricing_gtq = PLAN_PRICING_GTQ[plan_type]
-
-        plans.append({
-            'plan_type': plan_type,
-            'name': 'Plan Drive' if plan_type == 'DRIVE' else 'Plan Health',
-            'description': 'Asistencia Vial' if plan_type == 'DRIVE' else 'Asistencia de Salud',
-            'pricing': {
-                'USD': {
-                    'inclusion': {
-                        'monthly': float(pricing_usd['inclusion']['monthly']),
-                        'annual': float(pricing_usd['inclusion']['annual']),
-                    },
-                    'optional': {
-                        'monthly': float(pricing_usd['optional']['monthly']),
-                        'annual': float(pricing_usd['optional']['annual']),
-                    }
-                },
-                'GTQ': {
-                    'inclusion': {
-                        'monthly': float(pricing_gtq['inclusion']['monthly']),
-                        'annual': float(pricing_gtq['inclusion']['annual']),
-                    },
-                    'optional': {
-                        'monthly': float(pricing_gtq['optional']['monthly']),
-                        'annual': float(pricing_gtq['optional']['annual']),
-                    }
-                },
-                'exchange_rate': float(USD_TO_GTQ),
-            },
-            'services_with_limit': service_count,
-            'unlimited_services': unlimited_count,
-            'total_services': len(services),
-        })
+        plans.append(_build_plan_summary(plan_type))
 
     return Response({
         'provider': 'MAWDY',
@@ -76,20 +160,24 @@ def get_mawdy_plans(request):
         'address': MAWDYService.ADDRESS,
         'plans': plans,
         'business_rules': {
-            'geographic_area': BUSINESS_RULES['geographic_area'],
-            'vehicle_max_age_years': BUSINESS_RULES['vehicle_max_age_years'],
-            'vehicle_max_weight_tons': BUSINESS_RULES['vehicle_max_weight_tons'],
+            'geographic_area': BUSINESS_RULES.geographic_area,
+            'vehicle_max_age_years': BUSINESS_RULES.vehicle_max_age_years,
+            'vehicle_max_weight_tons': BUSINESS_RULES.vehicle_max_weight_tons,
         }
     })
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@catalog_cache
 def get_plan_services(request, plan_type):
     """
     Get all services for a specific plan.
 
     GET /api/providers/mawdy/plans/<plan_type>/services/
+
+    Deprecated for plan screens: use /plans/<plan_type>/overview/, which
+    also returns the plan summary and the user's usage.
     """
     plan_type = plan_type.upper()
 
@@ -99,26 +187,7 @@ def get_plan_services(request, plan_type):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    services = MAWDYService.get_plan_services(plan_type)
-
-    services_list = []
-    for code, service in services.items():
-        services_list.append({
-            'service_code': code,
-            'name': service['name'],
-            'description': service['description'],
-            'events_per_year': service.get('events_per_year', 'Ilimitado'),
-            'economic_limit_usd': float(service['economic_limit_usd']) if service.get('economic_limit_usd') else None,
-            'requires_evidence': service.get('requires_evidence', False),
-            'family_coverage': service.get('family_coverage', False),
-        })
-
-    return Response({
-        'plan_type': plan_type,
-        'plan_name': 'Plan Drive' if plan_type == 'DRIVE' else 'Plan Health',
-        'services': services_list,
-        'total': len(services_list)
-    })
+    return Response(_build_services_response(plan_type))
 
 
 @api_view(['GET'])
@@ -128,6 +197,33 @@ def get_my_usage(request, plan_type):
     Get current user's service usage for a plan.
 
     GET /api/providers/mawdy/plans/<plan_type>/my-usage/
+
+    Deprecated for plan screens: use /plans/<plan_type>/overview/.
+    """
+    plan_type = plan_type.upper()
+
+    if plan_type not in ['DRIVE', 'HEALTH']:
+        return Response(
+            {'error': 'Plan no válido. Use DRIVE o HEALTH'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    year = timezone.now().year
+    summary = MAWDYService.iter_user_usage_summary(request.user.id, plan_type, year)
+
+    return StreamingHttpResponse(
+        _stream_usage({'user_id': request.user.id, 'plan_type': plan_type, 'year': year}, summary),
+        content_type='application/json'
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_plan_overview(request, plan_type):
+    """
+    Get a plan's summary, services and the current user's usage in one call.
+
+    GET /api/providers/mawdy/plans/<plan_type>/overview/
     """
     plan_type = plan_type.upper()
 
@@ -138,13 +234,15 @@ def get_my_usage(request, plan_type):
         )
 
     year = timezone.now().year
-    summary = MAWDYService.get_user_usage_summary(request.user.id, plan_type, year)
 
     return Response({
-        'user_id': request.user.id,
-        'plan_type': plan_type,
-        'year': year,
-        'services': summary
+        'plan': _build_plan_summary(plan_type),
+        'services': _build_services_response(plan_type)['services'],
+        'usage': {
+            'user_id': request.user.id,
+            'year': year,
+            'services': MAWDYService.get_user_usage_summary(request.user.id, plan_type, year),
+        }
     })
 
 
@@ -264,52 +362,23 @@ def request_service(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@catalog_cache
 def get_contact_info(request):
     """
     Get MAWDY contact information.
 
     GET /api/providers/mawdy/contact/
     """
-    return Response({
-        'provider': 'MAWDY',
-        'phone': MAWDYService.CONTACT_PHONE,
-        'address': MAWDYService.ADDRESS,
-        'service_hours': '24/7',
-        'geographic_coverage': 'Guatemala',
-        'emergency_line': '+502 2285-5070',
-        'instructions': [
-            'Todos los servicios deben solicitarse a través de la central telefónica',
-            'No se operan reembolsos',
-            'Tenga a mano su número de póliza y documentos del vehículo',
-        ]
-    })
+    return HttpResponse(_contact_info_json(), content_type='application/json')
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdmin])
+@catalog_cache
 def get_business_rules(request):
     """
     Get MAWDY business rules (admin only).
 
     GET /api/providers/mawdy/business-rules/
     """
-    return Response({
-        'business_rules': BUSINESS_RULES,
-        'pricing': {
-            'USD': {
-                plan: {
-                    tier: {k: float(v) for k, v in prices.items()}
-                    for tier, prices in tiers.items()
-                }
-                for plan, tiers in PLAN_PRICING_USD.items()
-            },
-            'GTQ': {
-                plan: {
-                    tier: {k: float(v) for k, v in prices.items()}
-                    for tier, prices in tiers.items()
-                }
-                for plan, tiers in PLAN_PRICING_GTQ.items()
-            },
-            'exchange_rate': float(USD_TO_GTQ),
-        }
-    })
+    return HttpResponse(_business_rules_json(), content_type='application/json')
@@ -0,0 +1,31 @@
+from django.db import migrations
+
+
+INDEX_NAME = 'providers_p_service_areas_gin'
+
+
+def create_service_areas_index(apps, schema_editor):
+    # GIN over jsonb only exists on PostgreSQL; SQLite development databases skip it
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON providers_provider USING GIN (service_areas jsonb_path_ops)'
+    )
+
+
+def drop_service_areas_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0008_add_completion_data_to_joboffer'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_service_areas_index, drop_service_areas_index),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.1 on 2026-10-17 22:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('providers', '0010_provider_service_areas_gin_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='fieldtechprofile',
+            index=models.Index(fields=['current_latitude', 'current_longitude'], name='providers_f_current_c50319_idx'),
+        ),
+    ]
@@ -1,7 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.db.models import prefetch_related_objects
 from rest_framework import serializers
+from apps.services.serializers import ServiceCategorySerializer
 from .models import Provider, ProviderReview
 
 
+# Reviews embedded in the provider detail
+RECENT_REVIEWS_LIMIT = 5
+
+
+def recent_reviews_queryset():
+    """Reviews newest first, with their authors (ties broken by id so slices are stable)"""
+    return ProviderReview.objects.select_related('user').order_by('-created_at', '-id')
+
+
 class ProviderSerializer(serializers.ModelSerializer):
     """Serializer for Provider"""
 
@@ -21,6 +34,12 @@ class ProviderSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id', 'rating', 'total_reviews', 'total_completed', 'created_at', 'updated_at')
 
+    def to_representation(self, instance):
+        # service_categories and service_categories_names both read the M2M;
+        # load it once (no-op when the view already prefetched it)
+        prefetch_related_objects([instance], 'service_categories')
+        return super().to_representation(instance)
+
     def get_service_categories_names(self, obj):
         return [cat.name for cat in obj.service_categories.all()]
 
@@ -38,6 +57,10 @@ class ProviderListSerializer(serializers.ModelSerializer):
         )
 
     def get_service_categories_names(self, obj):
+        # Annotated in SQL by ProviderViewSet on PostgreSQL
+        names = getattr(obj, 'service_categories_names', None)
+        if names is not None:
+            return names
         return [cat.name for cat in obj.service_categories.all()]
 
 
@@ -47,7 +70,7 @@ class ProviderDetailSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     user_phone = serializers.CharField(source='user.phone_number', read_only=True)
-    service_categories_details = serializers.SerializerMethodField()
+    service_categories_details = ServiceCategorySerializer(source='service_categories', many=True, read_only=True)
     recent_reviews = serializers.SerializerMethodField()
 
     class Meta:
@@ -61,15 +84,35 @@ class ProviderDetailSerializer(serializers.ModelSerializer):
             'status', 'recent_reviews', 'created_at'
         )
 
-    def get_service_categories_details(self, obj):
-        from apps.services.serializers import ServiceCategorySerializer
-        return ServiceCategorySerializer(obj.service_categories.all(), many=True).data
-
     def get_recent_reviews(self, obj):
-        recent = obj.reviews.all()[:5]
+        # Prefetched by ProviderViewSet for retrieve
+        recent = getattr(obj, '_recent_reviews', None)
+        if recent is None:
+            recent = recent_reviews_queryset().filter(provider=obj)[:RECENT_REVIEWS_LIMIT]
         return ProviderReviewSerializer(recent, many=True).data
 
 
+def _attach_related(reviews, field_name, queryset):
+    """Load a FK missing from the reviews' cache with one query and attach it"""
+    field = ProviderReview._meta.get_field(field_name)
+    missing = [review for review in reviews if not field.is_cached(review)]
+    if not missing:
+        return
+    related = queryset.in_bulk({getattr(review, field.attname) for review in missing})
+    for review in missing:
+        field.set_cached_value(review, related.get(getattr(review, field.attname)))
+
+
+class ProviderReviewListSerializer(serializers.ListSerializer):
+    """Batch-loads review authors and providers not already joined, instead of one query per row"""
+
+    def to_representation(self, data):
+        reviews = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        _attach_related(reviews, 'user', get_user_model().objects.only('id', 'first_name', 'last_name'))
+        _attach_related(reviews, 'provider', Provider.objects.only('id', 'company_name'))
+        return super().to_representation(reviews)
+
+
 class ProviderReviewSerializer(serializers.ModelSerializer):
     """Serializer for Provider Review"""
 
@@ -83,6 +126,7 @@ class ProviderReviewSerializer(serializers.ModelSerializer):
             'rating', 'comment', 'created_at', 'updated_at'
         )
         read_only_fields = ('id', 'created_at', 'updated_at')
+        list_serializer_class = ProviderReviewListSerializer
 
     def validate_rating(self, value):
         if value < 1 or value > 5:
@@ -97,39 +141,25 @@ class ProviderReviewCreateSerializer(serializers.ModelSerializer):
         model = ProviderReview
         fields = ('provider', 'assistance_request', 'rating', 'comment')
 
-    def validate(self, attrs):
-        user = self.context['request'].user
-        provider = attrs.get('provider')
-        assistance_request = attrs.get('assistance_request')
-
-        # Check if user already reviewed this provider for this request
-        if assistance_request and ProviderReview.objects.filter(
-            provider=provider,
-            user=user,
-            assistance_request=assistance_request
-        ).exists():
-            raise serializers.ValidationError("You have already reviewed this provider for this request.")
-
-        return attrs
-
     def create(self, validated_data):
-        from django.db import transaction
-        from django.db.models import Avg, Count
+        from django.db import IntegrityError, transaction
 
         validated_data['user'] = self.context['request'].user
 
-        with transaction.atomic():
-            # Create the review
-            review = super().create(validated_data)
-
-            # Update provider rating (CRITICAL FIX: was not updating before)
-            provider = review.provider
-            stats = provider.reviews.aggregate(
-                avg_rating=Avg('rating'),
-                total=Count('id')
-            )
-            provider.rating = round(stats['avg_rating'] or 0, 2)
-            provider.total_reviews = stats['total']
-            provider.save(update_fields=['rating', 'total_reviews'])
-
-            return review
+        # Duplicate reviews per request are rejected by the
+        # (provider, user, assistance_request) unique constraint.
+        # Provider rating and total_reviews are updated by the post_save signal
+        try:
+            with transaction.atomic():
+                return super().create(validated_data)
+        except IntegrityError:
+            # Only a clash on the unique constraint is the user's duplicate (NULL
+            # requests never clash); re-raise FK, NOT NULL and other violations
+            assistance_request = validated_data.get('assistance_request')
+            if assistance_request is None or not ProviderReview.objects.filter(
+                provider=validated_data['provider'],
+                user=validated_data['user'],
+                assistance_request=assistance_request
+            ).exists():
+                raise
+            raise serializers.ValidationError("You have already reviewed this provider for this request.")
@@ -0,0 +1,83 @@
+"""
+Signals for providers
+"""
+from django.db.models import Avg, Count, DecimalField, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .list_cache import invalidate_provider_list_cache
+from apps.services.models import ServiceCategory
+from .models import Provider, ProviderReview
+
+
+def _review_aggregate(aggregate):
+    """Correlated subquery computing an aggregate over a provider's reviews"""
+    return Subquery(
+        ProviderReview.objects
+        .filter(provider=OuterRef('pk'))
+        .order_by()
+        .values('provider')
+        .annotate(value=aggregate)
+        .values('value')
+    )
+
+
+def refresh_provider_rating(provider_id):
+    """Recompute a provider's rating and total_reviews server-side in a single UPDATE"""
+    Provider.objects.filter(pk=provider_id).update(
+        rating=Coalesce(
+            Cast(_review_aggregate(Avg('rating')), DecimalField(max_digits=3, decimal_places=2)),
+            0,
+            output_field=DecimalField(max_digits=3, decimal_places=2)
+        ),
+        total_reviews=Coalesce(_review_aggregate(Count('id')), 0)
+    )
+
+
+@receiver(pre_save, sender=ProviderReview)
+def remember_review_rating(sender, instance, **kwargs):
+    """Keep the stored provider and rating of an edited review for post_save"""
+    instance._stored_rating = None
+    if instance.pk:
+        instance._stored_rating = (
+            ProviderReview.objects.filter(pk=instance.pk)
+            .values_list('provider_id', 'rating')
+            .first()
+        )
+
+
+@receiver(post_save, sender=ProviderReview)
+def update_provider_rating(sender, instance, created, **kwargs):
+    """Refresh the provider's average rating when a review is added or edited"""
+    stored = getattr(instance, '_stored_rating', None)
+    if stored == (instance.provider_id, instance.rating):
+        # Neither the provider nor the rating changed
+        return
+
+    refresh_provider_rating(instance.provider_id)
+    if stored and stored[0] != instance.provider_id:
+        # Moved to another provider: the old one lost a review
+        refresh_provider_rating(stored[0])
+    invalidate_provider_list_cache()
+
+
+@receiver(post_delete, sender=ProviderReview)
+def remove_provider_rating(sender, instance, **kwargs):
+    """Refresh the provider's average rating when a review is removed"""
+    refresh_provider_rating(instance.provider_id)
+    invalidate_provider_list_cache()
+
+
+@receiver(post_save, sender=Provider)
+@receiver(post_delete, sender=Provider)
+@receiver(m2m_changed, sender=Provider.service_categories.through)
+def provider_changed(sender, **kwargs):
+    """Drop cached provider list pages when a provider or its categories change"""
+    invalidate_provider_list_cache()
+
+
+@receiver(post_save, sender=ServiceCategory)
+@receiver(post_delete, sender=ServiceCategory)
+def service_category_changed(sender, **kwargs):
+    """Drop cached provider list pages, which render category names"""
+    invalidate_provider_list_cache()
@@ -1,3 +1,476 @@
-from django.test import TestCase
+"""
+Tests for Providers app
+"""
+import json
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient, APITestCase
+from rest_framework import status
+from apps.users.models import User
+from apps.assistance.models import AssistanceRequest
+from apps.services.models import ServiceCategory, ServicePlan
+from apps.providers.dispatch import DispatchService
+from apps.providers.models import Provider, ProviderReview
+from apps.providers.mawdy import MAWDYService
+
+
+class MAWDYServiceTest(TestCase):
+    """Test MAWDY service definitions and helpers"""
+
+    def test_check_vehicle_eligibility(self):
+        """Test vehicle eligibility reasons"""
+        result = MAWDYService.check_vehicle_eligibility(5, 2.5, 'particular')
+        self.assertTrue(result['eligible'])
+        result = MAWDYService.check_vehicle_eligibility(25, 4.0, 'comercial')
+        self.assertFalse(result['eligible'])
+        self.assertEqual(result['reasons'], [
+            'Vehículo excede 20 años de antigüedad',
+            'Vehículo excede 3.5 toneladas',
+            'Solo vehículos de uso particular',
+        ])
+
+
+class MAWDYAPITest(APITestCase):
+    """Test MAWDY API endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email='user@example.com',
+            password='UserPass123!',
+            first_name='Test',
+            last_name='User',
+            phone_number='+50255551111'
+        )
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='AdminPass123!',
+            role=User.Role.ADMIN
+        )
+
+    def test_get_plans(self):
+        """Test listing MAWDY plans with pricing"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-plans'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        drive = response.data['plans'][0]
+        self.assertEqual(drive['plan_type'], 'DRIVE')
+        self.assertEqual(drive['pricing']['GTQ']['inclusion']['monthly'], 24.41)
+        self.assertEqual(drive['services_with_limit'], 11)
+        self.assertEqual(drive['unlimited_services'], 3)
+
+    def test_get_plans_conditional_get(self):
+        """Test catalog endpoints honour If-None-Match"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-plans'))
+        self.assertIn('private', response['Cache-Control'])
+        response = self.client.get(reverse('mawdy-plans'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_catalog_error_response_not_cached(self):
+        """Test catalog error responses carry no ETag or Cache-Control"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-plan-services', args=['bike']))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Cache-Control'))
+
+    def test_get_plan_services(self):
+        """Test listing services for a plan"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-plan-services', args=['health']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], len(response.data['services']))
+        consulta = next(
+            s for s in response.data['services'] if s['service_code'] == 'CONSULTA_PRESENCIAL'
+        )
+        self.assertEqual(consulta['economic_limit_usd'], 150.0)
+        self.assertTrue(consulta['family_coverage'])
+
+    def test_get_my_usage(self):
+        """Test usage summary counts only active requests per service"""
+        grua = ServiceCategory.objects.create(name='Grúa', category_type='GRUA')
+        for request_status in ['COMPLETED', 'ASSIGNED', 'CANCELLED']:
+            AssistanceRequest.objects.create(
+                user=self.user,
+                service_category=grua,
+                title='Grúa',
+                description='Test',
+                location_address='Zona 10',
+                location_city='Guatemala',
+                location_state='Guatemala',
+                status=request_status
+            )
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-my-usage', args=['drive']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(data['plan_type'], 'DRIVE')
+        services = {s['service_code']: s for s in data['services']}
+        self.assertEqual(services['GRUA']['events_used'], 2)
+        self.assertEqual(services['GRUA']['remaining'], 1)
+        self.assertTrue(services['GRUA']['available'])
+        self.assertEqual(services['DESCUENTOS_RED']['remaining'], 'Ilimitado')
+        self.assertEqual(services['NEUMATICOS']['events_used'], 0)
+
+    def test_get_plan_overview(self):
+        """Test plan overview combines summary, services and usage"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-plan-overview', args=['drive']))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['plan']['plan_type'], 'DRIVE')
+        self.assertEqual(len(response.data['services']), response.data['plan']['total_services'])
+        self.assertEqual(len(response.data['usage']['services']), len(response.data['services']))
+
+    def test_request_service(self):
+        """Test requesting a MAWDY service creates a pending request"""
+        self.client.force_authenticate(user=self.user)
+        data = {
+            'plan_type': 'DRIVE',
+            'service_code': 'NEUMATICOS',
+            'location': {'address': 'Zona 10, Ciudad de Guatemala'},
+            'description': 'Llanta pinchada'
+        }
+        response = self.client.post(reverse('mawdy-request-service'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        request = AssistanceRequest.objects.get(id=response.data['request_id'])
+        self.assertEqual(request.incident_type, 'MAWDY_NEUMATICOS')
+        self.assertEqual(request.status, 'PENDING')
+
+    def test_check_vehicle_non_scalar_use_type(self):
+        """Test a non-string use_type is rejected as ineligible, not a server error"""
+        self.client.force_authenticate(user=self.user)
+        data = {'vehicle_age_years': 5, 'weight_tons': 2.5, 'use_type': ['particular']}
+        response = self.client.post(reverse('mawdy-check-vehicle'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['eligible'])
+
+    def test_get_business_rules_as_admin(self):
+        """Test business rules are exposed to admins"""
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get(reverse('mawdy-business-rules'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['business_rules']['vehicle_max_age_years'], 20)
+        self.assertEqual(data['pricing']['GTQ']['HEALTH']['optional']['annual'], 320.85)
+
+    def test_get_contact_info(self):
+        """Test contact info is served as JSON"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-contact'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json()['phone'], MAWDYService.CONTACT_PHONE)
+
+    def test_get_business_rules_as_regular_user(self):
+        """Test business rules are hidden from regular users"""
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('mawdy-business-rules'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ProviderAPITest(APITestCase):
+    """Test Provider endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.providers = []
+        for i, areas in enumerate([['Mixco', 'Villa Nueva'], ['Antigua Guatemala', 'Petén']]):
+            user = User.objects.create_user(
+                email=f'provider{i}@example.com',
+                password='ProviderPass123!',
+                role=User.Role.PROVIDER
+            )
+            self.providers.append(Provider.objects.create(
+                user=user,
+                company_name=f'Proveedor {i}',
+                business_license=f'LIC-00{i}',
+                business_phone='+50222222222',
+                business_email=f'info{i}@example.com',
+                address='Zona 1',
+                city='Guatemala',
+                state='Guatemala',
+                postal_code='01001',
+                service_areas=areas,
+                status=Provider.Status.ACTIVE
+            ))
+
+    def test_filter_providers_by_area(self):
+        """Test listing providers that serve an area"""
+        response = self.client.get(reverse('provider-list'), {'area': 'Mixco'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.providers[0].id])
+
+    def test_filter_providers_by_non_ascii_area(self):
+        """Test areas with accents match their stored JSON"""
+        response = self.client.get(reverse('provider-list'), {'area': 'Petén'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.providers[1].id])
+
+    def test_filter_providers_by_area_is_case_sensitive(self):
+        """Test the area filter matches case like jsonb containment on PostgreSQL"""
+        response = self.client.get(reverse('provider-list'), {'area': 'mixco'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], [])
+
+    def test_filter_providers_by_category(self):
+        """Test listing providers that offer a service category"""
+        grua = ServiceCategory.objects.create(name='Grúa', category_type='GRUA')
+        cerrajeria = ServiceCategory.objects.create(name='Cerrajería', category_type='CERRAJERIA')
+        self.providers[0].service_categories.add(grua, cerrajeria)
+        self.providers[1].service_categories.add(cerrajeria)
+
+        response = self.client.get(reverse('provider-list'), {'category': 'GRUA'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.providers[0].id])
+
+    def test_list_prefetches_service_categories(self):
+        """Test listing providers does not query categories per provider"""
+        grua = ServiceCategory.objects.create(name='Grúa', category_type='GRUA')
+        for provider in self.providers:
+            provider.service_categories.add(grua)
+
+        # COUNT for pagination, the providers page and one categories prefetch
+        with self.assertNumQueries(3) as queries:
+            response = self.client.get(reverse('provider-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['service_categories_names'], ['Grúa'])
+        self.assertNotIn('verification_notes', queries.captured_queries[1]['sql'])
+
+    @override_settings(PROVIDER_LIST_CACHE_ENABLED=True)
+    def test_list_is_cached_until_a_provider_changes(self):
+        """Test repeated list requests are served from the cache"""
+        self.client.get(reverse('provider-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('provider-list'))
+        self.assertEqual(response.data['count'], 2)
+
+        self.providers[1].status = Provider.Status.SUSPENDED
+        self.providers[1].save()
+        response = self.client.get(reverse('provider-list'))
+        self.assertEqual(response.data['count'], 1)
+
+    @override_settings(PROVIDER_LIST_CACHE_ENABLED=True)
+    def test_list_cache_dropped_when_a_category_changes(self):
+        """Test renaming a category invalidates cached list pages"""
+        grua = ServiceCategory.objects.create(name='Grúa', category_type='GRUA')
+        self.providers[0].service_categories.add(grua)
+        self.client.get(reverse('provider-list'))
+
+        grua.name = 'Grúa 24/7'
+        grua.save()
+        response = self.client.get(reverse('provider-list'))
+        names = {p['id']: p['service_categories_names'] for p in response.data['results']}
+        self.assertEqual(names[self.providers[0].id], ['Grúa 24/7'])
+
+    def test_list_not_cached_without_shared_cache(self):
+        """Test list pages are not cached in per-process local memory"""
+        self.client.get(reverse('provider-list'))
+        # COUNT for pagination, the providers page and one categories prefetch
+        with self.assertNumQueries(3):
+            self.client.get(reverse('provider-list'))
+
+    def test_available_lists_only_available_providers(self):
+        """Test available action uses the list representation"""
+        self.providers[1].is_available = False
+        self.providers[1].save()
+
+        response = self.client.get(reverse('provider-available'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([p['id'] for p in response.data], [self.providers[0].id])
+        self.assertNotIn('verification_notes', response.data[0])
+
+    def test_retrieve_includes_recent_reviews(self):
+        """Test provider detail lists its latest reviews"""
+        provider = self.providers[0]
+        for i in range(6):
+            user = User.objects.create_user(email=f'reviewer{i}@example.com', password='UserPass123!')
+            latest = ProviderReview.objects.create(provider=provider, user=user, rating=5)
+
+        self.client.force_authenticate(user=user)
+        response = self.client.get(reverse('provider-detail', args=[provider.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['recent_reviews']), 5)
+        self.assertEqual(response.data['recent_reviews'][0]['id'], latest.id)
+        self.assertEqual(response.data['recent_reviews'][0]['provider_name'], provider.company_name)
+
+
+class ProviderReviewAPITest(APITestCase):
+    """Test Provider review endpoints"""
+
+    def setUp(self):
+        self.client = APIClient()
+        provider_user = User.objects.create_user(
+            email='provider@example.com',
+            password='ProviderPass123!',
+            role=User.Role.PROVIDER
+        )
+        self.provider = Provider.objects.create(
+            user=provider_user,
+            company_name='Grúas GT',
+            business_license='LIC-001',
+            business_phone='+50222222222',
+            business_email='info@gruas.gt',
+            address='Zona 1',
+            city='Guatemala',
+            state='Guatemala',
+            postal_code='01001'
+        )
+        self.users = [
+            User.objects.create_user(email=f'user{i}@example.com', password='UserPass123!')
+            for i in range(3)
+        ]
+
+    def test_create_review_updates_provider_rating(self):
+        """Test each new review is folded into the provider average"""
+        for user, rating in zip(self.users, [5, 4, 4]):
+            self.client.force_authenticate(user=user)
+            response = self.client.post(
+                reverse('provider-review-list'),
+                {'provider': self.provider.id, 'rating': rating, 'comment': 'Buen servicio'},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.provider.refresh_from_db()
+        self.assertEqual(self.provider.total_reviews, 3)
+        self.assertEqual(str(self.provider.rating), '4.33')
+
+        ProviderReview.objects.filter(rating=5).delete()
+        self.provider.refresh_from_db()
+        self.assertEqual(self.provider.total_reviews, 2)
+        self.assertEqual(str(self.provider.rating), '4.00')
+
+    def test_edit_review_updates_provider_rating(self):
+        """Test editing a review's rating or provider refreshes both providers"""
+        other_user = User.objects.create_user(
+            email='other@example.com',
+            password='ProviderPass123!',
+            role=User.Role.PROVIDER
+        )
+        other = Provider.objects.create(
+            user=other_user,
+            company_name='Cerrajería GT',
+            business_license='LIC-002',
+            business_phone='+50222222223',
+            business_email='info@cerrajeria.gt',
+            address='Zona 4',
+            city='Guatemala',
+            state='Guatemala',
+            postal_code='01004'
+        )
+        ProviderReview.objects.create(provider=self.provider, user=self.users[0], rating=5)
+        review = ProviderReview.objects.create(provider=self.provider, user=self.users[1], rating=5)
+
+        self.client.force_authenticate(user=self.users[1])
+        url = reverse('provider-review-detail', args=[review.id])
+        response = self.client.patch(url, {'rating': 2}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.provider.refresh_from_db()
+        self.assertEqual(self.provider.total_reviews, 2)
+        self.assertEqual(str(self.provider.rating), '3.50')
+
+        response = self.client.patch(url, {'provider': other.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.provider.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.provider.total_reviews, str(self.provider.rating)), (1, '5.00'))
+        self.assertEqual((other.total_reviews, str(other.rating)), (1, '2.00'))
+
+    def test_list_reviews_joins_provider_and_user(self):
+        """Test listing reviews does not query provider or user per review"""
+        for user in self.users:
+            ProviderReview.objects.create(provider=self.provider, user=user, rating=4)
+
+        self.client.force_authenticate(user=self.users[0])
+        # COUNT for pagination and the reviews page
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('provider-review-list'), {'provider': self.provider.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(response.data['results'][0]['provider_name'], self.provider.company_name)
+
+    def test_duplicate_review_for_request_is_rejected(self):
+        """Test a user can review a provider only once per request"""
+        user = self.users[0]
+        assistance_request = AssistanceRequest.objects.create(
+            user=user,
+            service_category=ServiceCategory.objects.create(name='Grúa', category_type='GRUA'),
+            provider=self.provider,
+            title='Grúa',
+            description='Test',
+            location_address='Zona 10',
+            location_city='Guatemala',
+            location_state='Guatemala',
+            status='COMPLETED'
+        )
+        data = {
+            'provider': self.provider.id,
+            'assistance_request': assistance_request.id,
+            'rating': 5,
+            'comment': 'Buen servicio'
+        }
+
+        self.client.force_authenticate(user=user)
+        response = self.client.post(reverse('provider-review-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('provider-review-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.provider.refresh_from_db()
+        self.assertEqual(self.provider.total_reviews, 1)
+
+
+class DispatchServiceTest(TestCase):
+    """Test dispatch distance helpers"""
+
+    def test_bounding_box_contains_search_circle(self):
+        """Test points just inside the radius are inside the pre-filter box"""
+        latitude, longitude = 14.6349, -90.5069
+        box = DispatchService.bounding_box(latitude, longitude, 10)
+
+        north = latitude + 9.995 / 111.195
+        self.assertLess(DispatchService.calculate_distance(latitude, longitude, north, longitude), 10)
+        self.assertLessEqual(north, box['max_lat'])
+
+        east = longitude + 9.995 / (111.195 * 0.9677)
+        self.assertLess(DispatchService.calculate_distance(latitude, longitude, latitude, east), 10)
+        self.assertLessEqual(east, box['max_lon'])
+
+
+class SetupProductionDataCommandTest(TestCase):
+    """Test setup_production_data can be re-run"""
+
+    def _run(self, *args):
+        out = StringIO()
+        call_command('setup_production_data', '--fast', *args, stdout=out)
+        return out.getvalue()
+
+    def _row_counts(self):
+        return {
+            model.__name__: model.objects.count()
+            for model in (User, ServiceCategory, ServicePlan, Provider)
+        }
+
+    def test_keep_data_rerun_is_idempotent(self):
+        """Test a second --keep-data run updates rows instead of adding more"""
+        output = self._run('--keep-data')
+        self.assertIn('Service Plans: 6 created, 0 updated', output)
+        counts = self._row_counts()
+
+        output = self._run('--keep-data')
+        self.assertIn('Service Plans: 0 created, 6 updated', output)
+        self.assertEqual(self._row_counts(), counts)
+
+    def test_confirm_rerun_recreates_same_rows(self):
+        """Test a second --confirm run leaves the same row counts"""
+        self._run('--confirm')
+        counts = self._row_counts()
+
+        output = self._run('--confirm')
+        self.assertIn('Service Plans: 6 created, 0 updated', output)
+        self.assertEqual(self._row_counts(), counts)
@@ -5,6 +5,7 @@ from .mawdy_views import (
     get_mawdy_plans,
     get_plan_services,
     get_my_usage,
+    get_plan_overview,
     check_vehicle_eligibility,
     check_service_availability,
     request_service,
@@ -40,6 +41,7 @@ urlpatterns = [
     path('mawdy/plans/', get_mawdy_plans, name='mawdy-plans'),
     path('mawdy/plans/<str:plan_type>/services/', get_plan_services, name='mawdy-plan-services'),
     path('mawdy/plans/<str:plan_type>/my-usage/', get_my_usage, name='mawdy-my-usage'),
+    path('mawdy/plans/<str:plan_type>/overview/', get_plan_overview, name='mawdy-plan-overview'),
     path('mawdy/check-vehicle/', check_vehicle_eligibility, name='mawdy-check-vehicle'),
     path('mawdy/check-service/', check_service_availability, name='mawdy-check-service'),
     path('mawdy/request-service/', request_service, name='mawdy-request-service'),
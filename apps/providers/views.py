@@ -1,3 +1,9 @@
+import json
+
+from django.db import connection
+from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, StrIndex
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -5,13 +11,56 @@ from rest_framework.permissions import IsAuthenticated
 from .models import Provider, ProviderReview
 from .serializers import (
     ProviderSerializer, ProviderListSerializer, ProviderDetailSerializer,
-    ProviderReviewSerializer, ProviderReviewCreateSerializer
+    ProviderReviewSerializer, ProviderReviewCreateSerializer,
+    RECENT_REVIEWS_LIMIT, recent_reviews_queryset
 )
+from .list_cache import cached_provider_list
 from apps.users.permissions import IsAdmin, CanAccessProviderData
 
 
+LIST_COLUMNS = [
+    field for field in ProviderListSerializer.Meta.fields if field != 'service_categories_names'
+]
+
+
+REVIEW_LIST_COLUMNS = [
+    'provider', 'user', 'assistance_request', 'rating', 'comment', 'created_at', 'updated_at',
+    'provider__company_name', 'user__first_name', 'user__last_name',
+]
+
+
+def category_names_subquery():
+    """
+    Sorted category names per provider, aggregated in SQL (PostgreSQL only).
+
+    A correlated subquery rather than annotating ArrayAgg on the queryset, so
+    no GROUP BY is added to the list query and filters can't narrow the names.
+    """
+    from django.contrib.postgres.aggregates import ArrayAgg
+    from django.contrib.postgres.fields import ArrayField
+
+    names = (
+        Provider.service_categories.through.objects
+        .filter(provider=OuterRef('pk'))
+        .values('provider')
+        .annotate(names=ArrayAgg('servicecategory__name', ordering='servicecategory__name'))
+        .values('names')
+    )
+    return Coalesce(
+        Subquery(names),
+        Value([]),
+        output_field=ArrayField(models.CharField())
+    )
+
+
 class ProviderViewSet(viewsets.ModelViewSet):
-    """ViewSet for Providers"""
+    """
+    ViewSet for Providers
+
+    List/detail are many short read requests, so they rely on persistent
+    connections (CONN_MAX_AGE in settings, PostgreSQL only) to skip a new
+    TCP + auth handshake per request.
+    """
 
     queryset = Provider.objects.filter(status=Provider.Status.ACTIVE)
     permission_classes = [CanAccessProviderData]
@@ -20,7 +69,7 @@ class ProviderViewSet(viewsets.ModelViewSet):
     ordering_fields = ['rating', 'total_completed', 'created_at']
 
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in ('list', 'available'):
             return ProviderListSerializer
         elif self.action == 'retrieve':
             return ProviderDetailSerializer
@@ -30,39 +79,86 @@ class ProviderViewSet(viewsets.ModelViewSet):
         """Filter providers based on user role and query params"""
         queryset = self.queryset
         user = self.request.user
+        is_authenticated = user.is_authenticated
 
         # Admins see all providers
-        if user.is_authenticated and user.is_admin:
+        if is_authenticated and user.is_admin:
             queryset = Provider.objects.all()
         # Providers see only themselves
-        elif user.is_authenticated and user.is_provider:
+        elif is_authenticated and user.is_provider:
             queryset = Provider.objects.filter(user=user)
 
+        params = self.request.query_params
+
         # Filter by service category if provided
-        category = self.request.query_params.get('category', None)
+        category = params.get('category', None)
         if category:
-            queryset = queryset.filter(service_categories__category_type=category)
+            queryset = queryset.filter(Exists(
+                Provider.service_categories.through.objects.filter(
+                    provider=OuterRef('pk'),
+                    servicecategory__category_type=category
+                )
+            ))
+
+        # Filter by served city/area (GIN-indexed jsonb containment on PostgreSQL)
+        area = params.get('area', None)
+        if area:
+            if connection.vendor == 'postgresql':
+                queryset = queryset.filter(service_areas__contains=[area])
+            else:
+                # Case-sensitive match of the element as JSON-encoded in the stored
+                # text (non-ASCII is \u-escaped there), like containment on PostgreSQL
+                queryset = queryset.alias(
+                    area_position=StrIndex(Cast('service_areas', models.TextField()), Value(json.dumps(area)))
+                ).filter(area_position__gt=0)
 
         # Filter by availability
-        available = self.request.query_params.get('available', None)
+        available = params.get('available', None)
         if available:
             queryset = queryset.filter(is_available=True)
 
-        return queryset.distinct()
+        return self._with_related(queryset)
+
+    def list(self, request, *args, **kwargs):
+        """List providers, serving repeated requests from the cache"""
+        return Response(cached_provider_list(
+            request, lambda: super(ProviderViewSet, self).list(request, *args, **kwargs).data
+        ))
+
+    def _with_related(self, queryset):
+        """Prefetch the relations the action's serializer reads per provider"""
+        if self.action in ('list', 'available'):
+            # Only the columns ProviderListSerializer renders
+            queryset = queryset.only(*LIST_COLUMNS)
+            if connection.vendor == 'postgresql':
+                return queryset.annotate(service_categories_names=category_names_subquery())
+            return queryset.prefetch_related('service_categories')
+        if self.action == 'retrieve':
+            return queryset.select_related('user').prefetch_related(
+                'service_categories',
+                Prefetch(
+                    'reviews',
+                    queryset=recent_reviews_queryset()[:RECENT_REVIEWS_LIMIT],
+                    to_attr='_recent_reviews'
+                )
+            )
+        return queryset
 
     @action(detail=False, methods=['get'])
     def available(self, request):
-        """Get available providers"""
-        available_providers = self.queryset.filter(is_available=True)
-        serializer = self.get_serializer(available_providers, many=True)
-        return Response(serializer.data)
+        """Get available providers (same for every caller, so cached under one scope)"""
+        def build():
+            available_providers = self._with_related(self.queryset.filter(is_available=True))
+            return self.get_serializer(available_providers, many=True).data
+
+        return Response(cached_provider_list(request, build, scope='available'))
 
     @action(detail=True, methods=['post'])
     def toggle_availability(self, request, pk=None):
         """Toggle provider availability"""
         provider = self.get_object()
         provider.is_available = not provider.is_available
-        provider.save()
+        provider.save(update_fields=['is_available', 'updated_at'])
         return Response({
             'message': 'Availability updated',
             'is_available': provider.is_available
@@ -85,7 +181,10 @@ class ProviderReviewViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """Filter reviews by provider if specified"""
-        queryset = self.queryset
+        queryset = self.queryset.select_related('provider', 'user')
+        if self.action == 'list':
+            # Only what ProviderReviewSerializer renders, including provider_name / user_name
+            queryset = queryset.only(*REVIEW_LIST_COLUMNS)
         provider_id = self.request.query_params.get('provider', None)
         if provider_id:
             queryset = queryset.filter(provider_id=provider_id)
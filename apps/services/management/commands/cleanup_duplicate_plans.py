@@ -4,12 +4,27 @@ Keeps only ONE active plan per category type with correct SegurifAI pricing
 """
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from apps.services.models import ServiceCategory, ServicePlan
+from decimal import Decimal
 
 
 class Command(BaseCommand):
     help = 'Cleanup duplicate plans - keep only one active per category'
 
+    def deactivate(self, plans, message=None):
+        """Deactivate the active plans in a queryset with one UPDATE, returning the count"""
+        plans = plans.filter(is_active=True)
+        if message:
+            lines = [
+                message.format(name=name, price_monthly=price_monthly)
+                for name, price_monthly in plans.values_list('name', 'price_monthly')
+            ]
+            if lines:
+                self.stdout.write('\n'.join(lines))
+        # update() skips auto_now, so set updated_at explicitly
+        return plans.update(is_active=False, updated_at=timezone.now())
+
     def handle(self, *args, **options):
         self.stdout.write('='*60)
         self.stdout.write('CLEANING UP DUPLICATE PLANS...')
@@ -47,75 +62,61 @@ class Command(BaseCommand):
                     self.stdout.write(f'  No category found for {category_type}')
                     continue
 
-                # Find all plans in this category
+                # Find all plans in this category (one read serves the count and the match)
                 all_plans = ServicePlan.objects.filter(category=category)
-                self.stdout.write(f'  Found {all_plans.count()} plans in category')
+                plan_rows = list(all_plans.values_list('pk', 'name', 'price_monthly'))
+                self.stdout.write(f'  Found {len(plan_rows)} plans in category')
 
                 # Find the correct plan (by name and price)
-                correct_plan = all_plans.filter(
-                    name=plan_info['name'],
-                    price_monthly=plan_info['price_monthly']
-                ).first()
+                correct_price = Decimal(str(plan_info['price_monthly']))
+                correct_plan = next(
+                    (row for row in plan_rows if row[1] == plan_info['name'] and row[2] == correct_price),
+                    None
+                )
 
                 if correct_plan:
+                    correct_pk, correct_name, correct_price_monthly = correct_plan
                     # Keep this one active
-                    correct_plan.is_active = True
-                    correct_plan.save()
+                    all_plans.filter(pk=correct_pk).update(is_active=True, updated_at=timezone.now())
                     kept_count += 1
                     self.stdout.write(self.style.SUCCESS(
-                        f'  KEPT: {correct_plan.name} @ Q{correct_plan.price_monthly}/mes'
+                        f'  KEPT: {correct_name} @ Q{correct_price_monthly}/mes'
                     ))
 
                     # Deactivate all others in this category
-                    others = all_plans.exclude(pk=correct_plan.pk)
-                    for plan in others:
-                        if plan.is_active:
-                            plan.is_active = False
-                            plan.save()
-                            deactivated_count += 1
-                            self.stdout.write(f'  DEACTIVATED: {plan.name} @ Q{plan.price_monthly}/mes')
+                    others = all_plans.exclude(pk=correct_pk)
+                    deactivated_count += self.deactivate(others, '  DEACTIVATED: {name} @ Q{price_monthly}/mes')
                 else:
                     # Create or update the correct plan
                     self.stdout.write(f'  Creating correct plan: {plan_info["name"]}')
                     # Deactivate all existing
-                    for plan in all_plans:
-                        if plan.is_active:
-                            plan.is_active = False
-                            plan.save()
-                            deactivated_count += 1
-
-            # Deactivate ALL card insurance plans
-            card_plans = ServicePlan.objects.filter(
-                category__category_type='CARD_INSURANCE',
-                is_active=True
-            )
-            for plan in card_plans:
-                plan.is_active = False
-                plan.save()
-                deactivated_count += 1
-                self.stdout.write(f'  DEACTIVATED CARD: {plan.name}')
+                    deactivated_count += self.deactivate(all_plans)
 
-            # Deactivate any other plans not in our correct list
-            all_active = ServicePlan.objects.filter(is_active=True)
-            for plan in all_active:
-                cat_type = plan.category.category_type if plan.category else None
-                if cat_type not in correct_plans:
-                    plan.is_active = False
-                    plan.save()
-                    deactivated_count += 1
-                    self.stdout.write(f'  DEACTIVATED OTHER: {plan.name}')
+            # Deactivate ALL card insurance plans and any other plans not in our correct list.
+            # Card plans are among the others, so one UPDATE covers both
+            other_plans = ServicePlan.objects.exclude(category__category_type__in=correct_plans)
+            other_rows = list(other_plans.filter(is_active=True).values_list('name', 'category__category_type'))
+            lines = [f'  DEACTIVATED CARD: {name}' for name, category_type in other_rows if category_type == 'CARD_INSURANCE']
+            lines += [f'  DEACTIVATED OTHER: {name}' for name, category_type in other_rows if category_type != 'CARD_INSURANCE']
+            if lines:
+                self.stdout.write('\n'.join(lines))
+            deactivated_count += self.deactivate(other_plans)
 
         # Final count
-        active_plans = ServicePlan.objects.filter(is_active=True)
+        active_plans = list(
+            ServicePlan.objects.filter(is_active=True)
+            .values_list('name', 'category__category_type', 'price_monthly')
+        )
         self.stdout.write('\n' + '='*60)
         self.stdout.write(self.style.SUCCESS(
             f'CLEANUP COMPLETE!\n'
             f'  Plans kept active: {kept_count}\n'
             f'  Plans deactivated: {deactivated_count}\n'
-            f'  Total active plans now: {active_plans.count()}'
+            f'  Total active plans now: {len(active_plans)}'
         ))
 
-        self.stdout.write('\nActive plans:')
-        for plan in active_plans:
-            self.stdout.write(f'  - {plan.name} ({plan.category.category_type}) @ Q{plan.price_monthly}/mes')
+        self.stdout.write('\n'.join(
+            ['\nActive plans:'] +
+            [f'  - {name} ({category_type}) @ Q{price_monthly}/mes' for name, category_type, price_monthly in active_plans]
+        ))
         self.stdout.write('='*60)
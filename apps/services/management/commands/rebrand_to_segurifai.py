@@ -1,106 +1,195 @@
 """
 Management command to FORCE rebrand ALL plans to SegurifAI naming
-Runs on every deployment - UNCONDITIONALLY updates all plan names
+Runs on every deployment - updates every plan, category and provider that
+still carries old branding, and exits early once none is left
 """
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import F, Func, Q, TextField, Value
+from django.db.models.functions import Trim
+from django.utils import timezone
 from apps.services.models import ServiceCategory, ServicePlan
+from apps.providers.list_cache import invalidate_provider_list_cache
 from apps.providers.models import Provider
+import functools
+import operator
 import re
 
+# Default rows per UPDATE statement when writing back rebranded objects
+BULK_UPDATE_BATCH_SIZE = 500
+
+# Rows fetched per round-trip while scanning; only changed rows are kept in memory
+ITERATOR_CHUNK_SIZE = 1000
+
+# Single-pass cleanup: a run of brand names with its surrounding whitespace,
+# or any other whitespace run, becomes one space (then strip the ends)
+_PLAN_CLEAN_RE = re.compile(r'(?:\s*(?:MAPFRE|MAWDY))+\s*|\s+', re.IGNORECASE)
+_MAPFRE_CLEAN_RE = re.compile(r'(?:\s*MAPFRE)+\s*|\s+', re.IGNORECASE)
+_MAPFRE_WORD_RE = re.compile(r'MAPFRE', re.IGNORECASE)
+
+# Spellings of MAPFRE seen in stored data, swapped with plain str.replace()
+_MAPFRE_CASINGS = ('MAPFRE', 'Mapfre', 'mapfre')
+
+
+def _has_brand(text):
+    """Cheap substring check so unbranded text skips the regex entirely"""
+    lowered = (text or '').lower()
+    return 'mapfre' in lowered or 'mawdy' in lowered
+
+
+def _clean_brand(text, pattern=_PLAN_CLEAN_RE):
+    """Strip brand names from text and normalise its whitespace in one scan"""
+    return pattern.sub(' ', text).strip()
+
+
+def _replace_mapfre(text, replacement):
+    """Replace MAPFRE in any casing, using the regex only for unusual mixed casings"""
+    for casing in _MAPFRE_CASINGS:
+        text = text.replace(casing, replacement)
+    if 'mapfre' in text.lower():
+        text = _MAPFRE_WORD_RE.sub(replacement, text)
+    return text
+
+
+# Standard (name, description) for plans in the core categories
+STANDARD_PLANS = {
+    'ROADSIDE': (
+        'Plan Asistencia Vial',
+        'Plan de asistencia vial con seguro de muerte accidental',
+    ),
+    'HEALTH': (
+        'Plan Asistencia Médica',
+        'Plan de asistencia médica con seguro de muerte accidental',
+    ),
+    'INSURANCE': (
+        'Plan Seguro Accidentes',
+        'Seguro básico de accidentes personales con cobertura de muerte accidental',
+    ),
+}
+
+
+def _mentions_brand(*fields):
+    """Q matching rows where any of the fields mentions MAPFRE or MAWDY"""
+    return functools.reduce(operator.or_, (
+        Q(**{f'{field}__icontains': brand}) for field in fields for brand in ('mapfre', 'mawdy')
+    ))
+
+
+def _plans_needing_rebrand():
+    """Q for plans step 1 would change: off-standard core plans and branded others"""
+    condition = ~Q(category__category_type__in=STANDARD_PLANS) & _mentions_brand('name', 'description')
+    for category_type, (name, description) in STANDARD_PLANS.items():
+        condition |= Q(category__category_type=category_type) & (~Q(name=name) | ~Q(description=description))
+    return condition
+
+
+# Provider fields that may carry MAPFRE branding
+_PROVIDER_BRANDED_FIELDS = ('company_name', 'business_license', 'business_email', 'website', 'verification_notes')
+
+
+# Values that replace a provider field mentioning MAPFRE outright
+_PROVIDER_FIXED_REPLACEMENTS = {
+    'company_name': 'SegurifAI Guatemala',
+    'business_license': 'SegurifAI-GT-2024',
+    'business_email': 'asistencia@segurifai.com.gt',
+    'website': 'https://www.segurifai.com',
+}
+
+
+def _provider_mentions_mapfre():
+    """Q matching providers with MAPFRE in any branded field"""
+    return functools.reduce(operator.or_, (
+        Q(**{f'{field}__icontains': 'mapfre'}) for field in _PROVIDER_BRANDED_FIELDS
+    ))
+
+
+def _regexp_replace(expression, pattern, replacement, flags):
+    """PostgreSQL REGEXP_REPLACE(expression, pattern, replacement, flags)"""
+    return Func(
+        expression, Value(pattern), Value(replacement), Value(flags),
+        function='REGEXP_REPLACE', output_field=TextField()
+    )
+
+
+def _strip_mapfre_sql(field):
+    """SQL equivalent of _clean_brand(text, _MAPFRE_CLEAN_RE) in clean_categories"""
+    stripped = _regexp_replace(F(field), r'\s*MAPFRE\s*', ' ', 'gi')
+    return Trim(_regexp_replace(stripped, r'\s+', ' ', 'g'))
+
 
 class Command(BaseCommand):
     help = 'FORCE rebrand ALL plans to SegurifAI naming (removes ALL MAPFRE)'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BULK_UPDATE_BATCH_SIZE,
+            help=f'Rows per bulk UPDATE statement (default: {BULK_UPDATE_BATCH_SIZE})'
+        )
+
     def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+
         self.stdout.write('='*60)
         self.stdout.write('FORCE REBRANDING: Standardizing ALL plan names...')
         self.stdout.write('='*60)
 
+        # Every deploy after the first finds nothing to do; answer that with EXISTS probes
+        if not self.has_pending_changes():
+            self.stdout.write(self.style.SUCCESS('\nAlready rebranded - skipping'))
+            return
+
+        # bulk_update() skips auto_now, so stamp updated_at explicitly
+        now = timezone.now()
+
         with transaction.atomic():
             # ========================================
             # STEP 1: FORCE UPDATE ALL SERVICE PLANS
             # ========================================
             self.stdout.write('\n[STEP 1] Force-updating ALL service plans...')
 
-            updated_plans = 0
-            for plan in ServicePlan.objects.all():
-                original_name = plan.name
-                original_desc = plan.description
-                category_type = plan.category.category_type if plan.category else ''
-                changed = False
-
-                # Determine the correct name and description based on category
-                if category_type == 'ROADSIDE':
-                    new_name = 'Plan Asistencia Vial'
-                    new_desc = 'Plan de asistencia vial con seguro de muerte accidental'
-                elif category_type == 'HEALTH':
-                    new_name = 'Plan Asistencia Médica'
-                    new_desc = 'Plan de asistencia médica con seguro de muerte accidental'
-                elif category_type == 'INSURANCE':
-                    new_name = 'Plan Seguro Accidentes'
-                    new_desc = 'Seguro básico de accidentes personales con cobertura de muerte accidental'
-                else:
-                    # Fallback: clean any MAPFRE/MAWDY from name and description
-                    new_name = re.sub(r'\s*(MAPFRE|MAWDY)\s*', ' ', plan.name, flags=re.IGNORECASE).strip()
-                    new_name = re.sub(r'\s+', ' ', new_name)
-                    new_desc = plan.description
-
-                # Clean MAPFRE and MAWDY from description regardless
-                if plan.description:
-                    new_desc = re.sub(r'\s*(MAPFRE|MAWDY)\s*', ' ', plan.description, flags=re.IGNORECASE).strip()
-                    new_desc = re.sub(r'\s+', ' ', new_desc)
-                    # Replace with standard descriptions for known categories
-                    if category_type in ['ROADSIDE', 'HEALTH', 'INSURANCE']:
-                        if category_type == 'ROADSIDE':
-                            new_desc = 'Plan de asistencia vial con seguro de muerte accidental'
-                        elif category_type == 'HEALTH':
-                            new_desc = 'Plan de asistencia médica con seguro de muerte accidental'
-                        elif category_type == 'INSURANCE':
-                            new_desc = 'Seguro básico de accidentes personales con cobertura de muerte accidental'
-
-                if plan.name != new_name:
-                    self.stdout.write(f'  Name: "{original_name}" -> "{new_name}"')
-                    plan.name = new_name
-                    changed = True
-
-                if plan.description != new_desc:
-                    self.stdout.write(f'  Desc updated for: {new_name}')
-                    plan.description = new_desc
-                    changed = True
-
-                if changed:
-                    plan.save()
-                    updated_plans += 1
-
-            self.stdout.write(f'  Updated {updated_plans} plans')
+            dirty_plans = []
+            progress = []
+            plan_rows = (
+                ServicePlan.objects.filter(_plans_needing_rebrand())
+                .values_list('pk', 'name', 'description', 'category__category_type')
+            )
+            for pk, name, description, category_type in plan_rows.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+                # Core categories get their standard copy, anything else just loses the brand names
+                new_name, new_desc = STANDARD_PLANS.get(category_type) or (
+                    _clean_brand(name) if _has_brand(name) else name,
+                    _clean_brand(description) if _has_brand(description) else description,
+                )
+
+                if name != new_name:
+                    progress.append(f'  Name: "{name}" -> "{new_name}"')
+                if description != new_desc:
+                    progress.append(f'  Desc updated for: {new_name}')
+
+                if name != new_name or description != new_desc:
+                    # Only the columns written back by bulk_update() are set
+                    dirty_plans.append(
+                        ServicePlan(pk=pk, name=new_name, description=new_desc, updated_at=now)
+                    )
+
+            ServicePlan.objects.bulk_update(
+                dirty_plans, ['name', 'description', 'updated_at'], batch_size=self.batch_size
+            )
+            updated_plans = len(dirty_plans)
+            # Progress lines are collected during the scan and written in one go
+            progress.append(f'  Updated {updated_plans} plans')
+            self.stdout.write('\n'.join(progress))
 
             # ========================================
             # STEP 2: UPDATE SERVICE CATEGORIES
             # ========================================
             self.stdout.write('\n[STEP 2] Cleaning service categories...')
 
-            updated_cats = 0
-            for cat in ServiceCategory.objects.all():
-                changed = False
-
-                # Clean MAPFRE from name
-                if cat.name and 'mapfre' in cat.name.lower():
-                    cat.name = re.sub(r'\s*MAPFRE\s*', ' ', cat.name, flags=re.IGNORECASE).strip()
-                    cat.name = re.sub(r'\s+', ' ', cat.name)
-                    changed = True
-
-                # Clean MAPFRE from description
-                if cat.description and 'mapfre' in cat.description.lower():
-                    cat.description = re.sub(r'\s*MAPFRE\s*', ' ', cat.description, flags=re.IGNORECASE).strip()
-                    cat.description = re.sub(r'\s+', ' ', cat.description)
-                    changed = True
-
-                if changed:
-                    cat.save()
-                    updated_cats += 1
-                    self.stdout.write(f'  Updated category: {cat.name}')
-
+            if connection.vendor == 'postgresql':
+                updated_cats = self.clean_categories_in_db(now)
+            else:
+                updated_cats = self.clean_categories(now)
             self.stdout.write(f'  Updated {updated_cats} categories')
 
             # ========================================
@@ -108,42 +197,13 @@ class Command(BaseCommand):
             # ========================================
             self.stdout.write('\n[STEP 3] Cleaning providers...')
 
-            updated_providers = 0
-            for provider in Provider.objects.all():
-                changed = False
-
-                # Clean company_name
-                if provider.company_name and 'mapfre' in provider.company_name.lower():
-                    provider.company_name = 'SegurifAI Guatemala'
-                    changed = True
-
-                # Clean business_license
-                if provider.business_license and 'mapfre' in provider.business_license.lower():
-                    provider.business_license = 'SegurifAI-GT-2024'
-                    changed = True
-
-                # Fix email
-                if provider.business_email and 'mapfre' in provider.business_email.lower():
-                    provider.business_email = 'asistencia@segurifai.com.gt'
-                    changed = True
-
-                # Fix website
-                if provider.website and 'mapfre' in provider.website.lower():
-                    provider.website = 'https://www.segurifai.com'
-                    changed = True
-
-                # Clean verification_notes
-                if provider.verification_notes and 'mapfre' in provider.verification_notes.lower():
-                    provider.verification_notes = re.sub(r'MAPFRE', 'SegurifAI', provider.verification_notes, flags=re.IGNORECASE)
-                    changed = True
-
-                if changed:
-                    provider.save()
-                    updated_providers += 1
-                    self.stdout.write(f'  Updated provider: {provider.company_name}')
-
+            updated_providers = self.clean_providers(now)
             self.stdout.write(f'  Updated {updated_providers} providers')
 
+        # bulk_update() sends no post_save, so drop cached provider listings here
+        if updated_cats or updated_providers:
+            invalidate_provider_list_cache()
+
         # ========================================
         # FINAL SUMMARY
         # ========================================
@@ -156,3 +216,86 @@ class Command(BaseCommand):
             '\n  ALL plan names are now SegurifAI branded!'
         ))
         self.stdout.write('='*60)
+
+    def has_pending_changes(self):
+        """Whether any plan, category or provider still needs rebranding"""
+        return (
+            ServicePlan.objects.filter(_plans_needing_rebrand()).exists()
+            or ServiceCategory.objects.filter(Q(name__icontains='mapfre') | Q(description__icontains='mapfre')).exists()
+            or Provider.objects.filter(_provider_mentions_mapfre()).exists()
+        )
+
+    def clean_categories(self, now):
+        """Strip MAPFRE from category names and descriptions row by row"""
+        dirty_cats = []
+        candidates = ServiceCategory.objects.filter(
+            Q(name__icontains='mapfre') | Q(description__icontains='mapfre')
+        )
+        for cat in candidates.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            changed = False
+
+            # Clean MAPFRE from name
+            if cat.name and 'mapfre' in cat.name.lower():
+                cat.name = _clean_brand(cat.name, _MAPFRE_CLEAN_RE)
+                changed = True
+
+            # Clean MAPFRE from description
+            if cat.description and 'mapfre' in cat.description.lower():
+                cat.description = _clean_brand(cat.description, _MAPFRE_CLEAN_RE)
+                changed = True
+
+            if changed:
+                cat.updated_at = now
+                dirty_cats.append(cat)
+                self.stdout.write(f'  Updated category: {cat.name}')
+
+        ServiceCategory.objects.bulk_update(
+            dirty_cats, ['name', 'description', 'updated_at'], batch_size=self.batch_size
+        )
+        return len(dirty_cats)
+
+    def clean_categories_in_db(self, now):
+        """Strip MAPFRE from category names and descriptions with one UPDATE per field (PostgreSQL)"""
+        pks = list(
+            ServiceCategory.objects.filter(Q(name__icontains='mapfre') | Q(description__icontains='mapfre'))
+            .values_list('pk', flat=True)
+        )
+
+        for field in ('name', 'description'):
+            ServiceCategory.objects.filter(**{f'{field}__icontains': 'mapfre'}).update(
+                **{field: _strip_mapfre_sql(field), 'updated_at': now}
+            )
+
+        for name in ServiceCategory.objects.filter(pk__in=pks).values_list('name', flat=True):
+            self.stdout.write(f'  Updated category: {name}')
+        return len(pks)
+
+    def clean_providers(self, now):
+        """Replace MAPFRE branding on providers with one UPDATE per field"""
+        mapfre = {field: Q(**{f'{field}__icontains': 'mapfre'}) for field in _PROVIDER_BRANDED_FIELDS}
+        pks = list(Provider.objects.filter(_provider_mentions_mapfre()).values_list('pk', flat=True))
+
+        # Fixed replacements work on any database
+        for field, replacement in _PROVIDER_FIXED_REPLACEMENTS.items():
+            Provider.objects.filter(mapfre[field]).update(**{field: replacement, 'updated_at': now})
+
+        # verification_notes keeps its text, only the brand word is swapped
+        if connection.vendor == 'postgresql':
+            Provider.objects.filter(mapfre['verification_notes']).update(
+                verification_notes=_regexp_replace(F('verification_notes'), 'MAPFRE', 'SegurifAI', 'gi'),
+                updated_at=now
+            )
+        else:
+            dirty_providers = []
+            candidates = Provider.objects.filter(mapfre['verification_notes']).only('pk', 'verification_notes')
+            for provider in candidates.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+                provider.verification_notes = _replace_mapfre(provider.verification_notes, 'SegurifAI')
+                provider.updated_at = now
+                dirty_providers.append(provider)
+            Provider.objects.bulk_update(
+                dirty_providers, ['verification_notes', 'updated_at'], batch_size=self.batch_size
+            )
+
+        for company_name in Provider.objects.filter(pk__in=pks).values_list('company_name', flat=True):
+            self.stdout.write(f'  Updated provider: {company_name}')
+        return len(pks)
@@ -44,27 +44,16 @@ class Command(BaseCommand):
 
         self.stdout.write(f"Looking for user with phone: {phone_normalized}")
 
-        # Find user by phone number (try various formats)
-        user = None
-        search_patterns = [
-            phone_normalized,
-            f'+502{phone_normalized}',
-            f'502{phone_normalized}',
-        ]
-
-        for pattern in search_patterns:
-            try:
-                user = User.objects.get(phone_number__icontains=pattern[-8:])
-                break
-            except User.DoesNotExist:
-                continue
-            except User.MultipleObjectsReturned:
-                self.stdout.write(self.style.WARNING(
-                    f"Multiple users found with phone containing {pattern[-8:]}"
-                ))
-                # Get the first one
-                user = User.objects.filter(phone_number__icontains=pattern[-8:]).first()
-                break
+        # Find user by phone number: every accepted format reduces to the same
+        # last 8 digits, so a single icontains query covers them all
+        local_digits = phone_normalized[-8:]
+        matches = list(User.objects.filter(phone_number__icontains=local_digits)[:2])
+        if len(matches) > 1:
+            self.stdout.write(self.style.WARNING(
+                f"Multiple users found with phone containing {local_digits}"
+            ))
+        # Get the first one
+        user = matches[0] if matches else None
 
         if not user:
             raise CommandError(f'User with phone number {phone_number} not found')
@@ -73,9 +62,12 @@ class Command(BaseCommand):
             f"Found user: {user.email} (ID: {user.id}, Phone: {user.phone_number})"
         ))
 
-        # Get user's subscriptions
+        # Get user's subscriptions (loaded once, for both the count and the listing)
         subscriptions = UserService.objects.filter(user=user)
-        count = subscriptions.count()
+        listed = list(subscriptions.select_related('plan').only(
+            'id', 'status', 'start_date', 'end_date', 'plan__name'
+        ))
+        count = len(listed)
 
         if count == 0:
             self.stdout.write(self.style.WARNING(
@@ -84,11 +76,11 @@ class Command(BaseCommand):
             return
 
         self.stdout.write(f"Found {count} subscription(s):")
-        for sub in subscriptions:
-            self.stdout.write(
-                f"  - ID: {sub.id} | Plan: {sub.plan.name} | Status: {sub.status} | "
-                f"Start: {sub.start_date} | End: {sub.end_date}"
-            )
+        self.stdout.write('\n'.join(
+            f"  - ID: {sub.id} | Plan: {sub.plan.name} | Status: {sub.status} | "
+            f"Start: {sub.start_date} | End: {sub.end_date}"
+            for sub in listed
+        ))
 
         if dry_run:
             action = "Would delete" if delete_mode else "Would cancel"
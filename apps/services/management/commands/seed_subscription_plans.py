@@ -3,70 +3,53 @@ Management command to seed subscription plans
 """
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from django.utils import timezone
 from apps.services.models import ServiceCategory, ServicePlan
+from decimal import Decimal
 
+# Plan columns written back when an existing plan is updated in place
+PLAN_UPDATE_FIELDS = [
+    'name', 'description', 'price_monthly', 'price_yearly', 'duration_days', 'features',
+    'terms_and_conditions', 'max_requests_per_month', 'coverage_amount', 'is_active',
+    'is_featured', 'updated_at',
+]
 
-class Command(BaseCommand):
-    help = 'Seed subscription plans for testing'
-
-    def handle(self, *args, **options):
-        self.stdout.write('Seeding subscription plans...')
+# Categories the seeded plans belong to; INSURANCE holds the base accident insurance
+# and CARD_INSURANCE the Protege tu Tarjeta plan
+SEED_CATEGORIES = [
+    {
+        'category_type': 'ROADSIDE',
+        'name': 'Asistencia Vial',
+        'description': 'Servicio de asistencia en carretera 24/7',
+        'icon': 'truck',
+        'is_active': True
+    },
+    {
+        'category_type': 'HEALTH',
+        'name': 'Asistencia Medica',
+        'description': 'Asistencia medica de emergencia',
+        'icon': 'heart',
+        'is_active': True
+    },
+    {
+        'category_type': 'INSURANCE',
+        'name': 'Seguro de Accidentes',
+        'description': 'Seguro de accidentes personales SegurifAI',
+        'icon': 'shield',
+        'is_active': True
+    },
+    {
+        'category_type': 'CARD_INSURANCE',
+        'name': 'Protección de Tarjeta',
+        'description': 'Protección contra fraude y robo de tarjetas',
+        'icon': 'credit-card',
+        'is_active': True
+    },
+]
 
-        with transaction.atomic():
-            # Create service categories if they don't exist
-            roadside_cat, _ = ServiceCategory.objects.get_or_create(
-                category_type='ROADSIDE',
-                defaults={
-                    'name': 'Asistencia Vial',
-                    'description': 'Servicio de asistencia en carretera 24/7',
-                    'icon': 'truck',
-                    'is_active': True
-                }
-            )
-
-            health_cat, _ = ServiceCategory.objects.get_or_create(
-                category_type='HEALTH',
-                defaults={
-                    'name': 'Asistencia Medica',
-                    'description': 'Asistencia medica de emergencia',
-                    'icon': 'heart',
-                    'is_active': True
-                }
-            )
-
-            # Create or get insurance category for base accident insurance
-            insurance_cat, _ = ServiceCategory.objects.get_or_create(
-                category_type='INSURANCE',
-                defaults={
-                    'name': 'Seguro de Accidentes',
-                    'description': 'Seguro de accidentes personales SegurifAI',
-                    'icon': 'shield',
-                    'is_active': True
-                }
-            )
-
-            # Create or get card insurance category for Protege tu Tarjeta
-            card_cat, _ = ServiceCategory.objects.get_or_create(
-                category_type='CARD_INSURANCE',
-                defaults={
-                    'name': 'Protección de Tarjeta',
-                    'description': 'Protección contra fraude y robo de tarjetas',
-                    'icon': 'credit-card',
-                    'is_active': True
-                }
-            )
-            # Ensure card category is active
-            ServiceCategory.objects.filter(category_type='CARD_INSURANCE').update(is_active=True)
-
-            self.stdout.write('  Created service categories')
-
-            # AGGRESSIVE: Deactivate ALL existing plans first
-            # Only the 3 new SegurifAI plans will be activated below
-            deactivated_count = ServicePlan.objects.all().update(is_active=False)
-            self.stdout.write(f'  Deactivated {deactivated_count} existing plans')
 
-            # Terms and Conditions per PDF document
-            TARJETA_TERMS = """PROTEGE TU TARJETA - TÉRMINOS Y CONDICIONES
+# Terms and Conditions per PDF document
+TARJETA_TERMS = """PROTEGE TU TARJETA - TÉRMINOS Y CONDICIONES
 
 A) TARJETAS PERDIDAS O ROBADAS:
 La Aseguradora pagará al Tarjeta habiente por débitos realizados durante el Período de cobertura que Resulten directamente del uso de alguna Tarjeta Perdida o Robada, por alguna persona no autorizada para:
@@ -101,7 +84,7 @@ EXCLUSIONES:
 11. Usurpación de identidad para adquirir nuevos productos.
 12. Compras fraudulentas por negligencia del Asegurado (compartir credenciales, etc.)."""
 
-            SALUD_TERMS = """PROTEGE TU SALUD - TÉRMINOS Y CONDICIONES
+SALUD_TERMS = """PROTEGE TU SALUD - TÉRMINOS Y CONDICIONES
 
 MUERTE ACCIDENTAL: Q3,000.00
 Cobertura por fallecimiento accidental del titular.
@@ -124,7 +107,7 @@ SERVICIOS INCLUIDOS (Opción 2 - 30% Comisión):
 
 Asistencias SegurifAI incluidas."""
 
-            RUTA_TERMS = """PROTEGE TU RUTA - TÉRMINOS Y CONDICIONES
+RUTA_TERMS = """PROTEGE TU RUTA - TÉRMINOS Y CONDICIONES
 
 MUERTE ACCIDENTAL: Q3,000.00
 Cobertura por fallecimiento accidental del titular.
@@ -147,128 +130,216 @@ SERVICIOS INCLUIDOS (Opción 2 - 30% Comisión):
 
 Asistencias SegurifAI incluidas."""
 
-            # Update or create plans (SegurifAI pricing - Dec 2025)
-            plans_data = [
-                # PROTEGE TU TARJETA (PRF - Card Protection) - Q34.99
-                {
-                    'category': card_cat,
-                    'name': 'Protege tu Tarjeta',
-                    'description': 'Protección contra fraude, clonación y robo de tarjetas',
-                    'price_monthly': 34.99,
-                    'price_yearly': 419.88,
-                    'duration_days': 30,
-                    'features': [
-                        'Seguro Muerte Accidental Q3,000.00',
-                        'Tarjetas Perdidas o Robadas (48hrs para notificar)',
-                        'Protección contra Clonación de Tarjeta',
-                        'Protección contra Falsificación de Banda Magnética',
-                        'Cobertura Digital: Ingeniería Social',
-                        'Cobertura Digital: Phishing',
-                        'Cobertura Digital: Robo de Identidad',
-                        'Cobertura Digital: Suplantación (Spoofing)',
-                        'Cobertura Digital: Vishing',
-                        'Cobertura compras fraudulentas por internet',
-                        'Asistencias SegurifAI incluidas'
-                    ],
-                    'terms_and_conditions': TARJETA_TERMS,
-                    'max_requests_per_month': 3,
-                    'coverage_amount': 3000.00,
-                    'is_active': True,
-                    'is_featured': False
-                },
-
-                # PROTEGE TU SALUD (Asistencia Médica) - Q34.99 - All limits in GTQ
-                {
-                    'category': health_cat,
-                    'name': 'Protege tu Salud',
-                    'description': 'Asistencia médica completa con seguro de muerte accidental',
-                    'price_monthly': 34.99,
-                    'price_yearly': 419.88,
-                    'duration_days': 30,
-                    'features': [
-                        'Seguro Muerte Accidental Q3,000',
-                        'Orientación Médica Telefónica (Ilimitado)',
-                        'Conexión con Especialistas de la Red (Ilimitado)',
-                        'Consulta Presencial Médico/Ginecólogo/Pediatra (3/año, Q1,170)',
-                        'Coordinación de Medicamentos a Domicilio (Ilimitado)',
-                        'Cuidados Post Operatorios Enfermera (1/año, Q780)',
-                        'Envío Artículos Aseo por Hospitalización (1/año, Q780)',
-                        'Exámenes Lab: Heces, Orina, Hematología (2/año, Q780)',
-                        'Exámenes: Papanicoláu/Mamografía/Antígeno (2/año, Q780)',
-                        'Nutricionista Video Consulta Familiar (4/año, Q1,170)',
-                        'Psicología Video Consulta Familiar (4/año, Q1,170)',
-                        'Servicio de Mensajería por Hospitalización (2/año, Q470)',
-                        'Taxi Familiar por Hospitalización (2/año, Q780)',
-                        'Traslado en Ambulancia por Accidente (2/año, Q1,170)',
-                        'Taxi al Domicilio tras Alta (1/año, Q780)',
-                        'Asistencias SegurifAI incluidas'
-                    ],
-                    'terms_and_conditions': SALUD_TERMS,
-                    'max_requests_per_month': 3,
-                    'coverage_amount': 10608.00,
-                    'is_active': True,
-                    'is_featured': True
-                },
-
-                # PROTEGE TU RUTA (Asistencia Vial) - Q39.99 - All limits in GTQ
-                {
-                    'category': roadside_cat,
-                    'name': 'Protege tu Ruta',
-                    'description': 'Asistencia vial completa con seguro de muerte accidental',
-                    'price_monthly': 39.99,
-                    'price_yearly': 479.88,
-                    'duration_days': 30,
-                    'features': [
-                        'Seguro Muerte Accidental Q3,000',
-                        'Grúa del Vehículo (3/año, Q1,170)',
-                        'Abasto de Combustible 1 galón (3/año, Q1,170 combinado)',
-                        'Cambio de Neumáticos (3/año, Q1,170 combinado)',
-                        'Paso de Corriente (3/año, Q1,170 combinado)',
-                        'Emergencia de Cerrajería (3/año, Q1,170 combinado)',
-                        'Servicio de Ambulancia por Accidente (1/año, Q780)',
-                        'Servicio de Conductor Profesional (1/año, Q470)',
-                        'Taxi al Aeropuerto (1/año, Q470)',
-                        'Asistencia Legal Telefónica (1/año, Q1,560)',
-                        'Apoyo Económico Sala Emergencia (1/año, Q7,800)',
-                        'Rayos X (1/año, Q2,340, hasta 20% descuento)',
-                        'Descuentos en Red de Proveedores (hasta 20%)',
-                        'Asistente Telefónico Cotización Repuestos',
-                        'Asistente Telefónico Referencias Médicas por Accidente',
-                        'Asistencias SegurifAI incluidas'
-                    ],
-                    'terms_and_conditions': RUTA_TERMS,
-                    'max_requests_per_month': 3,
-                    'coverage_amount': 22776.00,
-                    'is_active': True,
-                    'is_featured': True
-                }
-            ]
 
+# Plans to update or create per category type (SegurifAI pricing - Dec 2025).
+# Features are tuples: the templates are shared across runs and must not be mutated,
+# and JSONField stores a tuple as the same JSON array.
+PLAN_TEMPLATES = {
+    # PROTEGE TU TARJETA (PRF - Card Protection) - Q34.99
+    'CARD_INSURANCE': {
+        'name': 'Protege tu Tarjeta',
+        'description': 'Protección contra fraude, clonación y robo de tarjetas',
+        'price_monthly': 34.99,
+        'price_yearly': 419.88,
+        'duration_days': 30,
+        'features': (
+            'Seguro Muerte Accidental Q3,000.00',
+            'Tarjetas Perdidas o Robadas (48hrs para notificar)',
+            'Protección contra Clonación de Tarjeta',
+            'Protección contra Falsificación de Banda Magnética',
+            'Cobertura Digital: Ingeniería Social',
+            'Cobertura Digital: Phishing',
+            'Cobertura Digital: Robo de Identidad',
+            'Cobertura Digital: Suplantación (Spoofing)',
+            'Cobertura Digital: Vishing',
+            'Cobertura compras fraudulentas por internet',
+            'Asistencias SegurifAI incluidas'
+        ),
+        'terms_and_conditions': TARJETA_TERMS,
+        'max_requests_per_month': 3,
+        'coverage_amount': 3000.00,
+        'is_active': True,
+        'is_featured': False
+    },
+
+    # PROTEGE TU SALUD (Asistencia Médica) - Q34.99 - All limits in GTQ
+    'HEALTH': {
+        'name': 'Protege tu Salud',
+        'description': 'Asistencia médica completa con seguro de muerte accidental',
+        'price_monthly': 34.99,
+        'price_yearly': 419.88,
+        'duration_days': 30,
+        'features': (
+            'Seguro Muerte Accidental Q3,000',
+            'Orientación Médica Telefónica (Ilimitado)',
+            'Conexión con Especialistas de la Red (Ilimitado)',
+            'Consulta Presencial Médico/Ginecólogo/Pediatra (3/año, Q1,170)',
+            'Coordinación de Medicamentos a Domicilio (Ilimitado)',
+            'Cuidados Post Operatorios Enfermera (1/año, Q780)',
+            'Envío Artículos Aseo por Hospitalización (1/año, Q780)',
+            'Exámenes Lab: Heces, Orina, Hematología (2/año, Q780)',
+            'Exámenes: Papanicoláu/Mamografía/Antígeno (2/año, Q780)',
+            'Nutricionista Video Consulta Familiar (4/año, Q1,170)',
+            'Psicología Video Consulta Familiar (4/año, Q1,170)',
+            'Servicio de Mensajería por Hospitalización (2/año, Q470)',
+            'Taxi Familiar por Hospitalización (2/año, Q780)',
+            'Traslado en Ambulancia por Accidente (2/año, Q1,170)',
+            'Taxi al Domicilio tras Alta (1/año, Q780)',
+            'Asistencias SegurifAI incluidas'
+        ),
+        'terms_and_conditions': SALUD_TERMS,
+        'max_requests_per_month': 3,
+        'coverage_amount': 10608.00,
+        'is_active': True,
+        'is_featured': True
+    },
+
+    # PROTEGE TU RUTA (Asistencia Vial) - Q39.99 - All limits in GTQ
+    'ROADSIDE': {
+        'name': 'Protege tu Ruta',
+        'description': 'Asistencia vial completa con seguro de muerte accidental',
+        'price_monthly': 39.99,
+        'price_yearly': 479.88,
+        'duration_days': 30,
+        'features': (
+            'Seguro Muerte Accidental Q3,000',
+            'Grúa del Vehículo (3/año, Q1,170)',
+            'Abasto de Combustible 1 galón (3/año, Q1,170 combinado)',
+            'Cambio de Neumáticos (3/año, Q1,170 combinado)',
+            'Paso de Corriente (3/año, Q1,170 combinado)',
+            'Emergencia de Cerrajería (3/año, Q1,170 combinado)',
+            'Servicio de Ambulancia por Accidente (1/año, Q780)',
+            'Servicio de Conductor Profesional (1/año, Q470)',
+            'Taxi al Aeropuerto (1/año, Q470)',
+            'Asistencia Legal Telefónica (1/año, Q1,560)',
+            'Apoyo Económico Sala Emergencia (1/año, Q7,800)',
+            'Rayos X (1/año, Q2,340, hasta 20% descuento)',
+            'Descuentos en Red de Proveedores (hasta 20%)',
+            'Asistente Telefónico Cotización Repuestos',
+            'Asistente Telefónico Referencias Médicas por Accidente',
+            'Asistencias SegurifAI incluidas'
+        ),
+        'terms_and_conditions': RUTA_TERMS,
+        'max_requests_per_month': 3,
+        'coverage_amount': 22776.00,
+        'is_active': True,
+        'is_featured': True
+    }
+}
+
+
+def _seeded_value(value):
+    """Normalise a template value to what the database hands back for it"""
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+class Command(BaseCommand):
+    help = 'Seed subscription plans for testing'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Seeding subscription plans...')
+
+        # Repeated runs usually find everything in place; check that with two reads
+        if self.is_up_to_date():
+            self.stdout.write(self.style.SUCCESS('Subscription plans already up to date'))
+            return
+
+        # Create service categories if they don't exist (existing rows are left as they are).
+        # Each write here is a single idempotent statement, so no transaction is held for them
+        category_types = [category_data['category_type'] for category_data in SEED_CATEGORIES]
+        categories = ServiceCategory.objects.in_bulk(category_types, field_name='category_type')
+        missing = [
+            ServiceCategory(**category_data) for category_data in SEED_CATEGORIES
+            if category_data['category_type'] not in categories
+        ]
+        if missing:
+            ServiceCategory.objects.bulk_create(missing, ignore_conflicts=True)
+            categories = ServiceCategory.objects.in_bulk(category_types, field_name='category_type')
+        card_cat = categories['CARD_INSURANCE']
+        # Ensure card category is active (only an existing, deactivated row needs the write)
+        if not card_cat.is_active:
+            ServiceCategory.objects.filter(pk=card_cat.pk).update(is_active=True)
+            card_cat.is_active = True
+
+        self.stdout.write('  Created service categories')
+
+        # Deactivating and re-activating plans must be seen as one change
+        with transaction.atomic():
             # Create or update plans - use CATEGORY as the key to rename old plans
             # This ensures existing subscriptions get updated to new plan names
-            for plan_data in plans_data:
-                category = plan_data['category']
-                # First, try to get the FIRST active or inactive plan in this category
-                existing_plan = ServicePlan.objects.filter(category=category).first()
+            # The FIRST active or inactive plan in each category, all fetched in one query
+            existing_plans = {}
+            seeded_categories = [categories[category_type] for category_type in PLAN_TEMPLATES]
+            for plan in ServicePlan.objects.filter(category__in=seeded_categories):
+                existing_plans.setdefault(plan.category_id, plan)
+
+            # AGGRESSIVE: Deactivate ALL other existing plans first
+            # The plans kept above end up active: unchanged ones already are, the rest are written below
+            deactivated_count = ServicePlan.objects.exclude(
+                pk__in=[plan.pk for plan in existing_plans.values()]
+            ).update(is_active=False)
+            self.stdout.write(f'  Deactivated {deactivated_count} existing plans')
+
+            # bulk_update() skips auto_now, so stamp updated_at explicitly
+            now = timezone.now()
+            plans_to_update = []
+            plans_to_create = []
+            lines = []
+            for category_type, plan_fields in PLAN_TEMPLATES.items():
+                category = categories[category_type]
+                existing_plan = existing_plans.get(category.pk)
 
-                if existing_plan:
+                if existing_plan and all(
+                    getattr(existing_plan, key) == _seeded_value(value) for key, value in plan_fields.items()
+                ):
+                    # Already matches its template: no UPDATE, updated_at is left alone
+                    lines.append(f'  Plan up to date: {existing_plan.name} - Q{existing_plan.price_monthly}/mes')
+                elif existing_plan:
                     # Update the existing plan (this preserves subscription references)
-                    for key, value in plan_data.items():
-                        if key != 'category':
-                            setattr(existing_plan, key, value)
-                    existing_plan.save()
-                    self.stdout.write(f'  Updated plan: {existing_plan.name} - Q{existing_plan.price_monthly}/mes')
+                    for key, value in plan_fields.items():
+                        setattr(existing_plan, key, value)
+                    existing_plan.updated_at = now
+                    plans_to_update.append(existing_plan)
+                    lines.append(f'  Updated plan: {existing_plan.name} - Q{existing_plan.price_monthly}/mes')
                 else:
                     # Create new plan if none exists for this category
-                    plan = ServicePlan.objects.create(**plan_data)
-                    self.stdout.write(f'  Created plan: {plan.name} - Q{plan.price_monthly}/mes')
+                    plan = ServicePlan(category=category, **plan_fields)
+                    plans_to_create.append(plan)
+                    lines.append(f'  Created plan: {plan.name} - Q{plan.price_monthly}/mes')
 
-                # Deactivate any OTHER plans in the same category
-                ServicePlan.objects.filter(category=category).exclude(
-                    name=plan_data['name']
-                ).update(is_active=False)
+            ServicePlan.objects.bulk_update(plans_to_update, PLAN_UPDATE_FIELDS)
+            ServicePlan.objects.bulk_create(plans_to_create)
+            self.stdout.write('\n'.join(lines))
+            # Any OTHER plans in the same categories stay inactive from the deactivation above
 
-        total_plans = ServicePlan.objects.count()
+        unchanged_count = len(PLAN_TEMPLATES) - len(plans_to_create) - len(plans_to_update)
         self.stdout.write(self.style.SUCCESS(
-            f'\nSuccessfully created {total_plans} subscription plans!'
+            f'\nSubscription plans seeded: {len(plans_to_create)} created, '
+            f'{len(plans_to_update)} updated, {unchanged_count} unchanged'
         ))
+
+    def is_up_to_date(self):
+        """Whether the seeded categories exist and exactly the template plans are active"""
+        categories = ServiceCategory.objects.in_bulk(
+            [category_data['category_type'] for category_data in SEED_CATEGORIES],
+            field_name='category_type'
+        )
+        if len(categories) != len(SEED_CATEGORIES) or not categories['CARD_INSURANCE'].is_active:
+            return False
+
+        expected = {
+            categories[category_type].pk: {field: _seeded_value(value) for field, value in plan_fields.items()}
+            for category_type, plan_fields in PLAN_TEMPLATES.items()
+        }
+        fields = [field for field in PLAN_UPDATE_FIELDS if field != 'updated_at']
+        active_plans = list(ServicePlan.objects.filter(is_active=True).values('category_id', *fields))
+
+        return (
+            len(active_plans) == len(expected)
+            and {plan['category_id'] for plan in active_plans} == set(expected)
+            and all(expected[plan.pop('category_id')] == plan for plan in active_plans)
+        )
@@ -1,13 +1,19 @@
 """
 Tests for Services app
 """
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from apps.users.models import User
 from apps.services.models import ServiceCategory, ServicePlan, UserService
 from datetime import date, timedelta
+from decimal import Decimal
 
 
 class ServiceModelTest(TestCase):
@@ -160,3 +166,117 @@ class ServiceAPITest(APITestCase):
         }
         response = self.client.post(url, data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+
+class RebrandCommandTest(TestCase):
+    """Test the rebrand_to_segurifai management command"""
+
+    def setUp(self):
+        self.category = ServiceCategory.objects.create(
+            name='Asistencia Vial',
+            category_type=ServiceCategory.CategoryType.ROADSIDE,
+            description='Asistencia en carretera',
+            is_active=True
+        )
+
+    def create_plans(self, count):
+        for i in range(count):
+            ServicePlan.objects.create(
+                category=self.category,
+                name=f'Plan MAPFRE {i}',
+                description='Plan de asistencia MAWDY',
+                price_monthly=99.00,
+                price_yearly=990.00
+            )
+
+    def run_rebrand(self, out=None):
+        with CaptureQueriesContext(connection) as queries:
+            call_command('rebrand_to_segurifai', stdout=out or StringIO())
+        return len(queries)
+
+    def test_rebrands_plans_in_core_categories(self):
+        """Test plans in a core category get the standard name"""
+        self.create_plans(2)
+        self.run_rebrand()
+        self.assertEqual(
+            set(ServicePlan.objects.values_list('name', flat=True)),
+            {'Plan Asistencia Vial'}
+        )
+
+    def test_plan_query_count_is_constant(self):
+        """Test the plan step does not query categories once per plan"""
+        self.create_plans(1)
+        single = self.run_rebrand()
+        ServicePlan.objects.all().delete()
+        self.create_plans(10)
+        self.assertEqual(self.run_rebrand(), single)
+
+    def test_skips_when_already_rebranded(self):
+        """Test a second run only checks for pending changes"""
+        self.create_plans(3)
+        self.run_rebrand()
+        out = StringIO()
+        self.assertEqual(self.run_rebrand(out), 3)
+        self.assertIn('Already rebranded', out.getvalue())
+
+
+class SeedSubscriptionPlansCommandTest(TestCase):
+    """Test the seed_subscription_plans management command"""
+
+    def setUp(self):
+        self.roadside = ServiceCategory.objects.create(
+            name='Asistencia Vial',
+            category_type=ServiceCategory.CategoryType.ROADSIDE,
+            description='Asistencia en carretera',
+            is_active=True
+        )
+        self.old_plan = ServicePlan.objects.create(
+            category=self.roadside,
+            name='Plan Vial Antiguo',
+            description='Plan anterior',
+            price_monthly=10.00
+        )
+        self.other_plan = ServicePlan.objects.create(
+            category=self.roadside,
+            name='Plan Vial Premium',
+            description='Otro plan',
+            price_monthly=50.00
+        )
+
+    def test_seed_renames_existing_plan_and_creates_missing(self):
+        """Test the first plan of a category is renamed and the others deactivated"""
+        out = StringIO()
+        call_command('seed_subscription_plans', stdout=out)
+        self.assertIn('2 created, 1 updated, 0 unchanged', out.getvalue())
+
+        self.old_plan.refresh_from_db()
+        self.other_plan.refresh_from_db()
+        self.assertEqual(self.old_plan.name, 'Protege tu Ruta')
+        self.assertTrue(self.old_plan.is_active)
+        self.assertFalse(self.other_plan.is_active)
+        self.assertEqual(
+            set(ServicePlan.objects.filter(is_active=True).values_list('name', flat=True)),
+            {'Protege tu Ruta', 'Protege tu Salud', 'Protege tu Tarjeta'}
+        )
+
+    def test_seed_is_idempotent(self):
+        """Test running the seeder twice leaves one plan per seeded category"""
+        call_command('seed_subscription_plans', stdout=StringIO())
+        out = StringIO()
+        call_command('seed_subscription_plans', stdout=out)
+        self.assertIn('already up to date', out.getvalue())
+        self.assertEqual(ServicePlan.objects.count(), 4)
+        self.assertEqual(ServicePlan.objects.filter(is_active=True).count(), 3)
+
+    def test_seed_reapplies_changed_plans(self):
+        """Test a plan edited after seeding is restored on the next run"""
+        call_command('seed_subscription_plans', stdout=StringIO())
+        ServicePlan.objects.filter(name='Protege tu Ruta').update(price_monthly=45.00)
+        salud_updated_at = ServicePlan.objects.get(name='Protege tu Salud').updated_at
+        out = StringIO()
+        call_command('seed_subscription_plans', stdout=out)
+        self.assertIn('Updated plan: Protege tu Ruta', out.getvalue())
+        self.assertIn('Plan up to date: Protege tu Salud', out.getvalue())
+        self.assertIn('0 created, 1 updated, 2 unchanged', out.getvalue())
+        self.assertEqual(ServicePlan.objects.get(name='Protege tu Ruta').price_monthly, Decimal('39.99'))
+        self.assertEqual(ServicePlan.objects.get(name='Protege tu Salud').updated_at, salud_updated_at)
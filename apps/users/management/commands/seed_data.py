@@ -18,6 +18,47 @@ from django.db import transaction
 
 User = get_user_model()
 
+# Service categories created by seed_data
+SERVICE_CATEGORIES = [
+    {
+        'name': 'Asistencia Vehicular',
+        'category_type': 'ROADSIDE',
+        'description': 'Servicios de asistencia para vehiculos',
+        'icon': 'car',
+    },
+    {
+        'name': 'Asistencia en Salud',
+        'category_type': 'HEALTH',
+        'description': 'Servicios de asistencia medica',
+        'icon': 'health',
+    },
+    {
+        'name': 'Seguro de Tarjeta',
+        'category_type': 'CARD_INSURANCE',
+        'description': 'Seguro para tarjetas de credito/debito',
+        'icon': 'credit-card',
+    },
+]
+
+# Plans seeded into the roadside category
+ROADSIDE_PLANS = [
+    {
+        'name': 'MAWDY Drive Inclusion',
+        'price_monthly': Decimal('24.41'),
+        'price_yearly': Decimal('292.95'),
+        'description': 'Plan basico de asistencia vehicular',
+        'features': ('Grua hasta 50km', 'Paso de corriente', 'Cambio de llanta', 'Cerrajeria'),
+    },
+    {
+        'name': 'MAWDY Drive Optional',
+        'price_monthly': Decimal('29.06'),
+        'price_yearly': Decimal('348.75'),
+        'description': 'Plan completo de asistencia vehicular',
+        'features': ('Grua hasta 100km', 'Paso de corriente', 'Cambio de llanta', 'Cerrajeria', 'Combustible', 'Hotel por averia'),
+        'is_featured': True,
+    },
+]
+
 
 class Command(BaseCommand):
     help = 'Seed database with test data for development and Postman testing'
@@ -171,68 +212,40 @@ class Command(BaseCommand):
 
         from apps.services.models import ServiceCategory, ServicePlan
 
-        categories_data = [
-            {
-                'name': 'Asistencia Vehicular',
-                'category_type': 'ROADSIDE',
-                'description': 'Servicios de asistencia para vehiculos',
-                'icon': 'car',
-            },
-            {
-                'name': 'Asistencia en Salud',
-                'category_type': 'HEALTH',
-                'description': 'Servicios de asistencia medica',
-                'icon': 'health',
-            },
-            {
-                'name': 'Seguro de Tarjeta',
-                'category_type': 'CARD_INSURANCE',
-                'description': 'Seguro para tarjetas de credito/debito',
-                'icon': 'credit-card',
-            },
-        ]
-
-        for cat_data in categories_data:
-            category, created = ServiceCategory.objects.get_or_create(
-                category_type=cat_data['category_type'],
-                defaults=cat_data
+        # One lookup for all categories; insert only the missing ones
+        category_types = [cat_data['category_type'] for cat_data in SERVICE_CATEGORIES]
+        categories = ServiceCategory.objects.in_bulk(category_types, field_name='category_type')
+        missing = [cat_data for cat_data in SERVICE_CATEGORIES if cat_data['category_type'] not in categories]
+        if missing:
+            ServiceCategory.objects.bulk_create(
+                [ServiceCategory(**cat_data) for cat_data in missing], ignore_conflicts=True
             )
-            if created:
-                self.stdout.write(f'  Created category: {category.name}')
-
-            # Create plans for this category
-            if cat_data['category_type'] == 'ROADSIDE':
-                self.vehicular_category = category
-                plans = [
-                    {
-                        'name': 'MAWDY Drive Inclusion',
-                        'price_monthly': Decimal('24.41'),
-                        'price_yearly': Decimal('292.95'),
-                        'description': 'Plan basico de asistencia vehicular',
-                        'features': ['Grua hasta 50km', 'Paso de corriente', 'Cambio de llanta', 'Cerrajeria'],
-                    },
-                    {
-                        'name': 'MAWDY Drive Optional',
-                        'price_monthly': Decimal('29.06'),
-                        'price_yearly': Decimal('348.75'),
-                        'description': 'Plan completo de asistencia vehicular',
-                        'features': ['Grua hasta 100km', 'Paso de corriente', 'Cambio de llanta', 'Cerrajeria', 'Combustible', 'Hotel por averia'],
-                        'is_featured': True,
-                    },
-                ]
-                for plan_data in plans:
-                    plan, created = ServicePlan.objects.get_or_create(
-                        category=category,
-                        name=plan_data['name'],
-                        defaults={
-                            'price_monthly': plan_data['price_monthly'],
-                            'price_yearly': plan_data['price_yearly'],
-                            'description': plan_data['description'],
-                            'features': plan_data.get('features', []),
-                            'is_active': True,
-                            'is_featured': plan_data.get('is_featured', False),
-                        }
-                    )
+            categories = ServiceCategory.objects.in_bulk(category_types, field_name='category_type')
+            self.stdout.write('\n'.join(f'  Created category: {cat_data["name"]}' for cat_data in missing))
+
+        # Create plans for the roadside category
+        category = categories['ROADSIDE']
+        self.vehicular_category = category
+
+        # Create only the plans this category doesn't have yet, in one INSERT
+        existing_names = set(
+            ServicePlan.objects.filter(
+                category=category, name__in=[plan_data['name'] for plan_data in ROADSIDE_PLANS]
+            ).values_list('name', flat=True)
+        )
+        ServicePlan.objects.bulk_create([
+            ServicePlan(
+                category=category,
+                name=plan_data['name'],
+                price_monthly=plan_data['price_monthly'],
+                price_yearly=plan_data['price_yearly'],
+                description=plan_data['description'],
+                features=list(plan_data.get('features', ())),
+                is_active=True,
+                is_featured=plan_data.get('is_featured', False),
+            )
+            for plan_data in ROADSIDE_PLANS if plan_data['name'] not in existing_names
+        ])
 
     def create_providers(self):
         """Create MAWDY as the only provider"""
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from decouple import config, Csv
+from django.core.exceptions import ImproperlyConfigured
 from decimal import Decimal
 from datetime import timedelta
 import sys
@@ -157,6 +158,35 @@ else:
         }
 
 
+# Cache (Redis when REDIS_URL is set, local memory otherwise)
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+
+# Provider list pages are cached only in a shared cache, so an invalidation on
+# one worker reaches the others
+PROVIDER_LIST_CACHE_ENABLED = bool(REDIS_URL)
+
+# ORM query cache (django-cachalot) for read-heavy, rarely written tables.
+# Invalidation is automatic on writes to these tables, but only reaches other
+# workers through a shared cache, so Redis is required.
+CACHALOT_ENABLED = config('CACHALOT_ENABLED', default=False, cast=bool)
+if CACHALOT_ENABLED and not REDIS_URL:
+    raise ImproperlyConfigured('CACHALOT_ENABLED requires REDIS_URL (a shared cache for invalidation)')
+if CACHALOT_ENABLED:
+    INSTALLED_APPS.append('cachalot')
+    CACHALOT_ONLY_CACHABLE_TABLES = [
+        'services_servicecategory',
+        'providers_provider',
+        'providers_provider_service_categories',
+    ]
+
+
 # Password Hashers (Argon2 preferred for PCI-DSS compliance)
 # https://docs.djangoproject.com/en/5.2/topics/auth/passwords/#using-argon2-with-django
 PASSWORD_HASHERS = [
@@ -238,6 +268,14 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# orjson-based JSON renderer (C encoder) instead of DRF's stdlib json one
+ORJSON_RENDERER_ENABLED = config('ORJSON_RENDERER_ENABLED', default=False, cast=bool)
+if ORJSON_RENDERER_ENABLED:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'drf_orjson_renderer.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+
 # JWT Settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('JWT_ACCESS_TOKEN_LIFETIME', default=60, cast=int)),
@@ -315,6 +353,8 @@ CSRF_TRUSTED_ORIGINS = [
 # Database Connection Settings
 if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
     DATABASES['default']['CONN_MAX_AGE'] = 600  # 10 minutes
+    # Ping reused connections at request start so a dropped one is replaced, not errored
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
     DATABASES['default']['OPTIONS'] = {'connect_timeout': 10}
 
 # =============================================================================